@@ -0,0 +1,23 @@
+import os
+import tempfile
+
+import pytest
+
+# Point the app at a throwaway database before `database` is first imported
+_test_dir = tempfile.mkdtemp(prefix="daily-quote-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_test_dir, 'test.db')}"
+os.environ["VECTOR_INDEX_DIR"] = os.path.join(_test_dir, "vector_indexes")
+
+@pytest.fixture
+def db():
+    """Session on an empty schema, recreated for every test"""
+    from database import engine, SessionLocal, Base
+    import models
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
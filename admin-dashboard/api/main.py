@@ -8,12 +8,20 @@ from dotenv import load_dotenv
 from database import engine, SessionLocal, Base
 from routers import quotes, auth, sentiment, vectors, system, files
 from models import User, Quote, SentimentResult, VectorSpace
+from services.job_service import shutdown_executor, fail_orphaned_jobs
+from services.search_index import ensure_search_index
+from services.quote_service import ensure_statistics_state
+from services.schema_migrations import ensure_vector_embedding_blobs, ensure_quote_content_hash
 
 # Load environment variables
 load_dotenv()
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+ensure_vector_embedding_blobs(engine)
+ensure_quote_content_hash(engine)
+ensure_search_index(engine)
+ensure_statistics_state(engine)
 
 app = FastAPI(
     title="Daily Quote Admin API",
@@ -51,6 +59,14 @@ app.include_router(vectors.router, prefix="/api/vectors", tags=["vectors"])
 app.include_router(system.router, prefix="/api/system", tags=["system"])
 app.include_router(files.router, prefix="/api/files", tags=["files"])
 
+@app.on_event("startup")
+def recover_jobs():
+    fail_orphaned_jobs()
+
+@app.on_event("shutdown")
+def stop_job_executor():
+    shutdown_executor()
+
 @app.get("/")
 async def root():
     return {"message": "Daily Quote Admin API v2.0", "status": "running"}
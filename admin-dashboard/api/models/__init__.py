@@ -2,5 +2,8 @@ from .user import User
 from .quote import Quote
 from .sentiment import SentimentResult
 from .vector import VectorSpace, QuoteVector
+from .job import BackgroundJob
+from .stats import QuoteStatistics, QuoteStatisticsState
 
-__all__ = ["User", "Quote", "SentimentResult", "VectorSpace", "QuoteVector"]
+__all__ = ["User", "Quote", "SentimentResult", "VectorSpace", "QuoteVector", "BackgroundJob", "QuoteStatistics",
+           "QuoteStatisticsState"]
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, String, Float, DateTime, Text, JSON
+from sqlalchemy.sql import func
+from database import Base
+
+class BackgroundJob(Base):
+    __tablename__ = "background_jobs"
+
+    id = Column(String(36), primary_key=True)  # uuid4
+    job_type = Column(String(50), nullable=False, index=True)  # 'sentiment', 'vectors', ...
+    status = Column(String(20), nullable=False, default="queued", index=True)  # queued, running, completed, failed
+    progress = Column(Float, default=0.0)
+    message = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    
+    parameters = Column(JSON, nullable=True)  # Arguments the job was started with
+    result = Column(JSON, nullable=True)  # Metrics and outputs (throughput, vector_space_id, ...)
+    worker = Column(String(100), nullable=True)  # host:pid of the API worker that submitted and claimed the job
+    
+    # Timing
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # Last sign of life from the dispatcher or the running job
+    
+    def __repr__(self):
+        return f"<BackgroundJob(id='{self.id}', type='{self.job_type}', status='{self.status}')>"
@@ -1,6 +1,8 @@
 from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, Enum
 from sqlalchemy.sql import func
 from database import Base
+import unicodedata
+import hashlib
 import enum
 
 class QuoteLanguage(enum.Enum):
@@ -9,6 +11,13 @@ class QuoteLanguage(enum.Enum):
     PORTUGUESE = "pt"
     ITALIAN = "it"
 
+def quote_content_hash(text: str, author: str) -> str:
+    """SHA-256 of the normalised (text, author) pair; case, Unicode form and spacing do not matter"""
+    normalized = "\x1f".join(
+        " ".join(unicodedata.normalize("NFKC", value).casefold().split()) for value in (text, author)
+    )
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
 class Quote(Base):
     __tablename__ = "quotes"
 
@@ -31,6 +40,7 @@ class Quote(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     file_source = Column(String(100), nullable=True)  # e.g., "quotes.txt"
     line_number = Column(Integer, nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)  # quote_content_hash(text, author)
     
     def __repr__(self):
         return f"<Quote(id={self.id}, author='{self.author}', language='{self.language}')>"
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from database import Base
+
+class QuoteStatistics(Base):
+    """Materialised quote counts per language, recomputed by QuoteService when stale"""
+    __tablename__ = "quote_stats"
+
+    language = Column(String(20), primary_key=True)  # QuoteLanguage name
+    total = Column(Integer, nullable=False, default=0)
+    positive = Column(Integer, nullable=False, default=0)
+    negative = Column(Integer, nullable=False, default=0)
+    neutral = Column(Integer, nullable=False, default=0)
+    unknown = Column(Integer, nullable=False, default=0)
+    verified = Column(Integer, nullable=False, default=0)
+    recent = Column(Integer, nullable=False, default=0)  # Added within QUOTE_STATS_RECENT_DAYS
+
+    def __repr__(self):
+        return f"<QuoteStatistics(language='{self.language}', total={self.total})>"
+
+class QuoteStatisticsState(Base):
+    """Single row tracking whether quote_stats is current: quote writes bump `version`"""
+    __tablename__ = "quote_stats_state"
+
+    id = Column(Integer, primary_key=True)  # Always 1
+    version = Column(Integer, nullable=False, default=1)
+    refreshed_version = Column(Integer, nullable=False, default=0)  # Version the stored counts were computed at
+    refreshed_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<QuoteStatisticsState(version={self.version}, refreshed_version={self.refreshed_version})>"
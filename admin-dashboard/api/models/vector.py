@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, JSON, LargeBinary
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
@@ -22,11 +22,11 @@ class QuoteVector(Base):
     __tablename__ = "quote_vectors"
 
     id = Column(Integer, primary_key=True, index=True)
-    quote_id = Column(Integer, ForeignKey("quotes.id"), nullable=False)
-    vector_space_id = Column(Integer, ForeignKey("vector_spaces.id"), nullable=False)
+    quote_id = Column(Integer, ForeignKey("quotes.id"), nullable=False, index=True)
+    vector_space_id = Column(Integer, ForeignKey("vector_spaces.id"), nullable=False, index=True)
     
-    # Vector embedding (stored as JSON array)
-    embedding = Column(JSON, nullable=False)
+    # Vector embedding: little-endian float32 bytes, or (int32, float32) pairs for sparse spaces
+    embedding = Column(LargeBinary, nullable=False)
     
     # Reduced dimensions for visualization (2D/3D)
     x_coord = Column(Float, nullable=True)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File, Form
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
@@ -7,6 +7,7 @@ from datetime import datetime
 from database import get_database
 from models.quote import Quote, QuoteLanguage
 from services.quote_service import QuoteService
+from services.duplicate_detection import MIN_THRESHOLD
 from utils.auth import get_current_user
 
 router = APIRouter()
@@ -139,31 +140,45 @@ async def delete_quote(
 
 @router.post("/bulk-import")
 async def bulk_import_quotes(
-    file_content: str,
-    language: QuoteLanguage = QuoteLanguage.ENGLISH,
-    source: Optional[str] = None,
+    file: UploadFile = File(...),
+    language: QuoteLanguage = Form(QuoteLanguage.ENGLISH),
+    source: Optional[str] = Form(None),
     db: Session = Depends(get_database),
     current_user = Depends(get_current_user)
 ):
-    """Bulk import quotes from text content"""
+    """Upload a quotes file and import it in the background"""
     service = QuoteService(db)
-    result = await service.bulk_import(file_content, language, source)
+    job_id = await service.start_import(file, language, source or file.filename)
     return {
-        "imported": result["imported"],
-        "skipped": result["skipped"],
-        "errors": result["errors"]
+        "job_id": job_id,
+        "status": "started",
+        "message": "Bulk import started"
     }
 
+@router.get("/bulk-import/{job_id}")
+async def get_import_status(
+    job_id: str,
+    db: Session = Depends(get_database),
+    current_user = Depends(get_current_user)
+):
+    """Get bulk import job status and counts"""
+    service = QuoteService(db)
+    job_status = await service.get_import_status(job_id)
+    if not job_status:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status
+
 @router.get("/duplicates/find")
 async def find_duplicates(
-    threshold: float = Query(0.8, ge=0.1, le=1.0),
+    threshold: float = Query(0.8, ge=MIN_THRESHOLD, le=1.0),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=500),
     db: Session = Depends(get_database),
     current_user = Depends(get_current_user)
 ):
-    """Find potential duplicate quotes"""
+    """Find potential duplicate quotes (paginated, most similar first)"""
     service = QuoteService(db)
-    duplicates = await service.find_duplicates(threshold)
-    return {"duplicates": duplicates}
+    return await service.find_duplicates(threshold, page, page_size)
 
 @router.post("/duplicates/merge")
 async def merge_duplicates(
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict
 from pydantic import BaseModel
@@ -34,17 +34,15 @@ async def get_sentiment_statistics(
 
 @router.post("/analyze", response_model=SentimentJobResponse)
 async def start_sentiment_analysis(
-    background_tasks: BackgroundTasks,
     language: Optional[str] = Query("en", regex="^(en|es|pt|it)$"),
     force_reanalyze: bool = Query(False),
+    workers: Optional[int] = Query(None, ge=1, le=64),
     db: Session = Depends(get_database),
     current_user = Depends(get_current_user)
 ):
     """Start sentiment analysis for quotes"""
     service = SentimentService(db)
-    job_id = await service.start_analysis(
-        background_tasks, language, force_reanalyze
-    )
+    job_id = await service.start_analysis(language, force_reanalyze, workers)
     
     return {
         "job_id": job_id,
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import Dict, List
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 import psutil
 import os
@@ -8,6 +8,10 @@ from datetime import datetime
 
 from database import get_database
 from services.system_service import SystemService
+from services.job_service import list_jobs, get_job
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
 from utils.auth import get_current_user
 
 router = APIRouter()
@@ -45,6 +49,49 @@ async def get_process_status(
     service = SystemService(db)
     return await service.get_process_status()
 
+@router.get("/jobs")
+async def list_background_jobs(
+    job_type: Optional[str] = Query(None, regex="^(sentiment|vectors|import)$"),
+    status: Optional[str] = Query(None, regex="^(queued|running|completed|failed)$"),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_database),
+    current_user = Depends(get_current_user)
+):
+    """List recent background jobs with their progress and timing"""
+    return {"jobs": list_jobs(db, job_type, status, limit)}
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_progress(
+    job_id: str,
+    current_user = Depends(get_current_user)
+):
+    """Stream a job's progress as server-sent events until it finishes"""
+    from database import SessionLocal
+    
+    def read_job():
+        db = SessionLocal()
+        try:
+            return get_job(db, job_id)
+        finally:
+            db.close()
+    
+    if read_job() is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def events():
+        last = None
+        while True:
+            job = read_job()
+            snapshot = (job["status"], job["progress"], job["message"])
+            if snapshot != last:
+                last = snapshot
+                yield f"data: {json.dumps(job, default=str)}\n\n"
+            if job["status"] in ("completed", "failed"):
+                return
+            await asyncio.sleep(0.5)
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 @router.get("/logs")
 async def get_system_logs(
     level: str = Query("INFO", regex="^(DEBUG|INFO|WARNING|ERROR|CRITICAL)$"),
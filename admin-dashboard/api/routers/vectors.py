@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict
 from pydantic import BaseModel
@@ -34,7 +34,6 @@ async def list_vector_spaces(
 
 @router.post("/generate")
 async def generate_vectors(
-    background_tasks: BackgroundTasks,
     algorithm: str = Query("tfidf", regex="^(tfidf|word2vec|bert)$"),
     max_features: int = Query(5000, ge=100, le=10000),
     language: str = Query("en", regex="^(en|es|pt|it)$"),
@@ -43,9 +42,7 @@ async def generate_vectors(
 ):
     """Generate vectors for quotes"""
     service = VectorService(db)
-    job_id = await service.generate_vectors(
-        background_tasks, algorithm, max_features, language
-    )
+    job_id = await service.generate_vectors(algorithm, max_features, language)
     
     return {
         "job_id": job_id,
@@ -53,6 +50,21 @@ async def generate_vectors(
         "message": "Vector generation started"
     }
 
+@router.get("/jobs/{job_id}")
+async def get_job_status(
+    job_id: str,
+    db: Session = Depends(get_database),
+    current_user = Depends(get_current_user)
+):
+    """Get vector generation job status"""
+    service = VectorService(db)
+    job_status = await service.get_job_status(job_id)
+    
+    if not job_status:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job_status
+
 @router.get("/similarity/{quote_id}")
 async def find_similar_quotes(
     quote_id: int,
@@ -70,15 +82,67 @@ async def find_similar_quotes(
     
     return {"similar_quotes": similar_quotes}
 
+@router.get("/spaces/{vector_space_id}/index")
+async def get_index_stats(
+    vector_space_id: int,
+    db: Session = Depends(get_database),
+    current_user = Depends(get_current_user)
+):
+    """Get ANN index statistics, including recall@k against exact search"""
+    service = VectorService(db)
+    stats = await service.get_index_stats(vector_space_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Index not found or out of date")
+    return stats
+
+@router.post("/spaces/{vector_space_id}/index")
+async def rebuild_index(
+    vector_space_id: int,
+    n_lists: Optional[int] = Query(None, ge=1, le=4096),
+    n_probe: int = Query(8, ge=1, le=4096),
+    k: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_database),
+    current_user = Depends(get_current_user)
+):
+    """Rebuild the ANN index of a vector space and report its recall@k"""
+    service = VectorService(db)
+    stats = await service.rebuild_index(vector_space_id, n_lists, n_probe, k)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Vector space not found")
+    return stats
+
 @router.get("/clusters")
 async def get_quote_clusters(
     vector_space_id: Optional[int] = None,
     n_clusters: int = Query(5, ge=2, le=20),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    n_exemplars: int = Query(3, ge=1, le=20),
+    db: Session = Depends(get_database),
+    current_user = Depends(get_current_user)
+):
+    """Get a page of quote cluster summaries from vector analysis"""
+    service = VectorService(db)
+    clusters = await service.get_clusters(vector_space_id, n_clusters, page, page_size, n_exemplars)
+    
+    if clusters is None:
+        return {"clusters": []}
+    return clusters
+
+@router.get("/clusters/{cluster_id}")
+async def get_cluster_members(
+    cluster_id: int,
+    vector_space_id: Optional[int] = None,
+    n_clusters: int = Query(5, ge=2, le=20),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
     db: Session = Depends(get_database),
     current_user = Depends(get_current_user)
 ):
-    """Get quote clusters from vector analysis"""
+    """Get a page of the quotes in one cluster"""
     service = VectorService(db)
-    clusters = await service.get_clusters(vector_space_id, n_clusters)
+    members = await service.get_cluster_members(cluster_id, vector_space_id, n_clusters, page, page_size)
     
-    return {"clusters": clusters}
+    if members is None:
+        raise HTTPException(status_code=404, detail="Cluster not found")
+    return members
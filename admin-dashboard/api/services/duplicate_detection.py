@@ -0,0 +1,189 @@
+from typing import List, Dict, Tuple, Iterable
+from collections import defaultdict
+from difflib import SequenceMatcher
+import threading
+import re
+import numpy as np
+
+NUM_PERM = 128
+SHINGLE_SIZE = 5
+
+# Lowest supported SequenceMatcher threshold: below it true pairs share so few shingles that
+# LSH has to compare a large share of all pairs and the scan is no longer interactive
+MIN_THRESHOLD = 0.75
+
+# Shingle Jaccard that 95% of pairs at a given SequenceMatcher ratio reach, interpolated
+# linearly in between: the lower 5th percentile of the quote corpus's own near-duplicates
+# and of quotes with words dropped, swapped or mistyped (which share fewer shingles)
+RATIO_JACCARD = [(0.6, 0.08), (0.7, 0.2), (0.8, 0.33), (0.9, 0.55), (0.95, 0.74), (1.0, 1.0)]
+
+# Probability with which a pair at that Jaccard must become an LSH candidate
+LSH_TARGET_RECALL = 0.95
+# Standard errors below that Jaccard a candidate's MinHash estimate may fall before it is dropped
+CANDIDATE_MARGIN = 2.5
+
+# Characters processed per vectorised MinHash step (bounds the NUM_PERM x chunk temporary)
+SIGNATURE_CHUNK = 1 << 15
+
+# Random odd 64-bit multipliers: polynomial shingle hashing over code points, then
+# multiply-shift permutations (top 32 bits of a * h + b mod 2^64) for MinHash
+_rng = np.random.RandomState(1)
+_SHINGLE_WEIGHTS = _rng.randint(0, 1 << 63, size=SHINGLE_SIZE, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_PERM_A = _rng.randint(0, 1 << 63, size=NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_PERM_B = _rng.randint(0, 1 << 63, size=NUM_PERM, dtype=np.uint64)
+_SHIFT = np.uint64(32)
+
+def normalize_for_shingles(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so formatting changes do not hide duplicates"""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+def _chunk_signatures(normalized: List[str]) -> np.ndarray:
+    """MinHash signatures of normalised texts, each at least SHINGLE_SIZE characters long"""
+    lengths = np.array([len(text) for text in normalized])
+    code_points = np.frombuffer("".join(normalized).encode("utf-32-le", "surrogatepass"), dtype="<u4")
+    windows = np.lib.stride_tricks.sliding_window_view(code_points.astype(np.uint64), SHINGLE_SIZE)
+
+    # Keep only the shingles that lie inside one text; offsets mark where each text's shingles start
+    counts = lengths - SHINGLE_SIZE + 1
+    offsets = np.cumsum(counts) - counts
+    positions = np.arange(counts.sum()) + np.repeat(np.cumsum(lengths) - lengths - offsets, counts)
+
+    with np.errstate(over="ignore"):
+        hashes = (windows[positions] * _SHINGLE_WEIGHTS).sum(axis=1, dtype=np.uint64) >> _SHIFT
+        permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) >> _SHIFT
+    return np.minimum.reduceat(permuted, offsets, axis=1).T
+
+def minhash_signatures(texts: List[str]) -> np.ndarray:
+    """MinHash signatures over character shingles, one row of NUM_PERM minima per text"""
+    # Padding gives texts shorter than a shingle exactly one shingle: the whole text
+    normalized = [normalize_for_shingles(text).ljust(SHINGLE_SIZE) for text in texts]
+    signatures = np.empty((len(texts), NUM_PERM), dtype=np.uint64)
+    start = 0
+    while start < len(texts):
+        end, total = start, 0
+        while end < len(texts) and (end == start or total + len(normalized[end]) <= SIGNATURE_CHUNK):
+            total += len(normalized[end])
+            end += 1
+        signatures[start:end] = _chunk_signatures(normalized[start:end])
+        start = end
+    return signatures
+
+def expected_jaccard(threshold: float) -> float:
+    """Shingle Jaccard that 95% of pairs at a SequenceMatcher threshold reach (see RATIO_JACCARD)"""
+    ratios, jaccards = zip(*RATIO_JACCARD)
+    return float(np.interp(threshold, ratios, jaccards))
+
+def lsh_bands(threshold: float) -> int:
+    """
+    Number of LSH bands for a SequenceMatcher threshold.
+
+    Picks the longest bands (fewest chance candidates) that still make pairs at the
+    threshold's expected Jaccard candidates with probability LSH_TARGET_RECALL.
+    """
+    jaccard = expected_jaccard(threshold)
+    for rows in range(NUM_PERM, 1, -1):
+        bands = NUM_PERM // rows
+        if 1 - (1 - jaccard ** rows) ** bands >= LSH_TARGET_RECALL:
+            return bands
+    return NUM_PERM
+
+def candidate_pairs(signatures: np.ndarray, bands: int) -> Iterable[Tuple[int, int]]:
+    """Row pairs that share at least one LSH band of their signatures"""
+    rows = signatures.shape[1] // bands
+    seen = set()
+    for band in range(bands):
+        band_keys = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        _, bucket, sizes = np.unique(band_keys.view(f"V{band_keys.itemsize * rows}").ravel(),
+                                     return_inverse=True, return_counts=True)
+        # Only buckets holding more than one row produce pairs
+        shared = np.flatnonzero(sizes[bucket] > 1)
+        buckets = defaultdict(list)
+        for row in shared.tolist():
+            buckets[bucket[row]].append(row)
+        for members in buckets.values():
+            for i, first in enumerate(members):
+                for second in members[i + 1:]:
+                    if (first, second) not in seen:
+                        seen.add((first, second))
+                        yield first, second
+
+def similar_candidates(signatures: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    LSH candidate pairs whose estimated Jaccard (the share of equal MinHash values) is not
+    far below what pairs at the threshold reach.
+
+    Short bands let many pairs through on a single common shingle; dropping those before
+    the exact check keeps low thresholds affordable. The margin is CANDIDATE_MARGIN
+    standard errors of the estimate.
+    """
+    candidates = np.array(list(candidate_pairs(signatures, lsh_bands(threshold))), dtype=np.int64).reshape(-1, 2)
+    jaccard = expected_jaccard(threshold)
+    minimum = jaccard - CANDIDATE_MARGIN * np.sqrt(jaccard * (1 - jaccard) / signatures.shape[1])
+    keep = np.zeros(len(candidates), dtype=bool)
+    for start in range(0, len(candidates), SIGNATURE_CHUNK):
+        chunk = candidates[start:start + SIGNATURE_CHUNK]
+        agreement = (signatures[chunk[:, 0]] == signatures[chunk[:, 1]]).mean(axis=1)
+        keep[start:start + len(chunk)] = agreement >= minimum
+    return candidates[keep]
+
+def find_near_duplicates(quotes: List[Tuple[int, str]], threshold: float = 0.8) -> List[Tuple[int, int, float]]:
+    """
+    Find quote pairs whose SequenceMatcher ratio is at least `threshold`.
+
+    Identical texts are paired directly. MinHash/LSH over character shingles proposes
+    candidate pairs among the distinct texts and each candidate is verified with the exact
+    ratio, so every reported pair passes the same check as before without its N^2 cost.
+    The banding follows the threshold (see lsh_bands and similar_candidates); about 5% of
+    pairs with unusually little shingle overlap for their ratio can still be missed.
+    """
+    ids_by_text = defaultdict(list)
+    for quote_id, text in quotes:
+        ids_by_text[text].append(quote_id)
+    texts = list(ids_by_text)
+
+    pairs = []
+    for ids in ids_by_text.values():
+        for i, first in enumerate(ids):
+            pairs.extend((first, second, 1.0) for second in ids[i + 1:])
+
+    if len(texts) > 1:
+        signatures = minhash_signatures(texts)
+        for first, second in similar_candidates(signatures, threshold).tolist():
+            text1, text2 = texts[first], texts[second]
+            # Length bound: ratio <= 2 * min(len) / (len1 + len2)
+            if 2 * min(len(text1), len(text2)) < threshold * (len(text1) + len(text2)):
+                continue
+            matcher = SequenceMatcher(None, text1, text2)
+            if matcher.quick_ratio() < threshold:
+                continue
+            # ratio() depends on argument order; like a full scan, compare the lower id's text first
+            similarities = {}
+            for id1 in ids_by_text[text1]:
+                for id2 in ids_by_text[text2]:
+                    forward = id1 < id2
+                    if forward not in similarities:
+                        similarities[forward] = (
+                            matcher.ratio() if forward else SequenceMatcher(None, text2, text1).ratio()
+                        )
+                    if similarities[forward] >= threshold:
+                        pairs.append((min(id1, id2), max(id1, id2), similarities[forward]))
+
+    pairs.sort(key=lambda pair: (-pair[2], pair[0], pair[1]))
+    return pairs
+
+# Results per (threshold, corpus version); pages of the same scan are served from here
+_duplicate_cache: Dict[Tuple[float, Tuple], List[Tuple[int, int, float]]] = {}
+_duplicate_cache_lock = threading.Lock()
+
+def cached_near_duplicates(version: Tuple, quotes_loader, threshold: float) -> List[Tuple[int, int, float]]:
+    """Near-duplicate pairs for a corpus version, computing them once per (version, threshold)"""
+    key = (round(threshold, 4), version)
+    with _duplicate_cache_lock:
+        if key in _duplicate_cache:
+            return _duplicate_cache[key]
+        # Drop results for older corpus versions
+        for stale in [k for k in _duplicate_cache if k[1] != version]:
+            del _duplicate_cache[stale]
+        pairs = find_near_duplicates(quotes_loader(), threshold)
+        _duplicate_cache[key] = pairs
+        return pairs
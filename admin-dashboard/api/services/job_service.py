@@ -0,0 +1,427 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import update, select, func, and_, text
+from sqlalchemy.exc import OperationalError
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+from typing import Optional, Dict, Any, Callable, Tuple
+from datetime import datetime, timedelta
+import threading
+import socket
+import psutil
+import uuid
+import contextlib
+import time
+import os
+
+from database import SessionLocal, engine
+from models.job import BackgroundJob
+
+# Jobs of one type allowed to run at once, across every API worker sharing the database
+JOB_CONCURRENCY = {
+    "sentiment": int(os.getenv("JOB_CONCURRENCY_SENTIMENT", "1")),
+    "vectors": int(os.getenv("JOB_CONCURRENCY_VECTORS", "1")),
+    # Concurrent imports could both insert a quote neither has committed yet
+    "import": int(os.getenv("JOB_CONCURRENCY_IMPORT", "1")),
+}
+DEFAULT_JOB_CONCURRENCY = 2
+
+# Processes per API worker that run jobs; CPU-bound work there never holds the event loop's GIL,
+# so request latency stays flat while jobs run. Jobs are only handed to the pool once claimed.
+JOB_EXECUTOR_WORKERS = int(os.getenv("JOB_EXECUTOR_WORKERS", "4"))
+JOB_START_METHOD = os.getenv("JOB_START_METHOD", "spawn")
+
+# A running job with no heartbeat for this long is treated as dead (its worker exited)
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "600"))
+
+# Minimum seconds between progress-only writes; new messages and status changes are always written
+JOB_PROGRESS_INTERVAL = 0.5
+JOB_POLL_INTERVAL = 1.0
+JOB_HEARTBEAT_INTERVAL = 30.0
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+SHUTDOWN_MESSAGE = "Cancelled: the API worker shut down before the job started"
+
+# Job parameter naming an input file the job owns (e.g. a spooled upload). The runner deletes it
+# when it finishes; the registry deletes it when the job fails without the runner getting to run
+SPOOL_PARAMETER = "spool_path"
+
+class JobHandle:
+    """Progress reporter passed to a running job; every write goes to the background_jobs table"""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.result: Dict[str, Any] = {}
+        self._last_write = 0.0
+        self._last_message = None
+
+    def _write(self, attempts: int = 1, **values):
+        """Write job columns; progress writes are best effort, status changes are retried"""
+        for attempt in range(attempts):
+            db = SessionLocal()
+            try:
+                values["heartbeat_at"] = datetime.utcnow()
+                db.execute(update(BackgroundJob).where(BackgroundJob.id == self.job_id).values(**values))
+                db.commit()
+                self._last_write = time.monotonic()
+                return
+            except OperationalError as e:
+                db.rollback()
+                if attempt == attempts - 1:
+                    print(f"Could not record progress for job {self.job_id}: {e}")
+                else:
+                    time.sleep(JOB_POLL_INTERVAL)
+            finally:
+                db.close()
+
+    def update(self, progress: Optional[float] = None, message: Optional[str] = None, **metrics):
+        """Record progress, a status message and/or result metrics (progress-only updates are throttled)"""
+        self.result.update(metrics)
+        values = {}
+        if progress is not None:
+            values["progress"] = float(progress)
+        if message is not None:
+            values["message"] = message
+        if metrics:
+            values["result"] = dict(self.result)
+        changed = message is not None and message != self._last_message
+        if changed or time.monotonic() - self._last_write >= JOB_PROGRESS_INTERVAL:
+            self._last_message = message if message is not None else self._last_message
+            self._write(**values)
+
+    def complete(self, message: str, **result):
+        """Mark the job completed with its final message and result"""
+        self.result.update(result)
+        self._write(attempts=10, status="completed", progress=100.0, message=message,
+                    result=dict(self.result), finished_at=datetime.utcnow())
+
+    def fail(self, message: str, error: Optional[str] = None):
+        """Mark the job failed"""
+        self._write(attempts=10, status="failed", message=message, error=error or message,
+                    result=dict(self.result), finished_at=datetime.utcnow())
+
+def _concurrency_limit(job_type: str) -> int:
+    return JOB_CONCURRENCY.get(job_type, DEFAULT_JOB_CONCURRENCY)
+
+def _remove_spool(parameters: Optional[Dict[str, Any]]):
+    """Delete the input file of a job that will never run (already gone if its runner cleaned up)"""
+    path = (parameters or {}).get(SPOOL_PARAMETER)
+    if path:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+def _fail_stale_jobs(db: Session):
+    """
+    Fail jobs whose worker stopped sending heartbeats, so they stop holding a slot.
+
+    Running jobs are kept alive by their pool process, queued ones by the dispatcher
+    of the API worker that submitted them.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+    failed = db.execute(
+        update(BackgroundJob)
+        .where(BackgroundJob.status.in_(("queued", "running")),
+               func.coalesce(BackgroundJob.heartbeat_at, BackgroundJob.created_at) < cutoff)
+        .values(status="failed", error="Worker stopped responding", finished_at=datetime.utcnow())
+        .returning(BackgroundJob.parameters)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.commit()
+    for parameters in failed:
+        _remove_spool(parameters)
+
+def _worker_gone(worker: Optional[str]) -> bool:
+    """Whether the API worker recorded on a job has exited; workers on other hosts are left to the heartbeat check"""
+    if not worker or worker == WORKER_ID:
+        # Unrecorded, or a previous process that had this host and pid
+        return True
+    host, _, pid = worker.rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    return not psutil.pid_exists(int(pid))
+
+def fail_orphaned_jobs():
+    """Fail queued and running jobs of API workers that have exited (called on API startup)"""
+    db = SessionLocal()
+    try:
+        jobs = db.query(BackgroundJob.id, BackgroundJob.worker).filter(
+            BackgroundJob.status.in_(("queued", "running"))
+        ).all()
+        orphaned = [job_id for job_id, worker in jobs if _worker_gone(worker)]
+        if orphaned:
+            failed = db.execute(
+                update(BackgroundJob)
+                .where(BackgroundJob.id.in_(orphaned), BackgroundJob.status.in_(("queued", "running")))
+                .values(status="failed", error="API worker exited before the job finished",
+                        finished_at=datetime.utcnow())
+                .returning(BackgroundJob.parameters)
+                .execution_options(synchronize_session=False)
+            ).scalars().all()
+            db.commit()
+            for parameters in failed:
+                _remove_spool(parameters)
+        _fail_stale_jobs(db)
+    finally:
+        db.close()
+
+def _claim(db: Session, job_id: str, job_type: str) -> bool:
+    """Atomically move a queued job to running if its type is below its concurrency limit"""
+    if db.get_bind().dialect.name == "postgresql":
+        # Under READ COMMITTED two claims could both count the same running jobs; serialise
+        # claims per job type for the rest of this transaction (SQLite already serialises writers)
+        db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": f"background_jobs:{job_type}"})
+    running = (
+        select(func.count(BackgroundJob.id))
+        .where(BackgroundJob.job_type == job_type, BackgroundJob.status == "running")
+        .scalar_subquery()
+    )
+    now = datetime.utcnow()
+    claimed = db.execute(
+        update(BackgroundJob)
+        .where(and_(BackgroundJob.id == job_id, BackgroundJob.status == "queued",
+                    running < _concurrency_limit(job_type)))
+        .values(status="running", started_at=now, heartbeat_at=now, worker=WORKER_ID,
+                message="Running...")
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return claimed.rowcount == 1
+
+def _run(job_id: str, runner: Callable, parameters: Dict[str, Any]):
+    """Executor entry point: run a claimed job with a session of its own"""
+    job = JobHandle(job_id)
+    # Heartbeats keep long steps without progress writes (t-SNE, model loading) from looking stale
+    stopped = threading.Event()
+    def heartbeat():
+        while not stopped.wait(JOB_HEARTBEAT_INTERVAL):
+            job._write()
+    threading.Thread(target=heartbeat, daemon=True).start()
+
+    db = SessionLocal()
+    try:
+        runner(db, job, **parameters)
+    except Exception as e:
+        db.rollback()
+        job.fail(f"Job failed: {e}", str(e))
+    finally:
+        stopped.set()
+        db.close()
+
+def _init_worker():
+    """Job process initializer: never reuse database connections inherited from the API process"""
+    engine.dispose(close=False)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def get_executor() -> ProcessPoolExecutor:
+    """The process pool jobs run on; each job opens its own sessions there"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=JOB_EXECUTOR_WORKERS,
+                mp_context=multiprocessing.get_context(JOB_START_METHOD),
+                initializer=_init_worker
+            )
+        return _executor
+
+def _reset_executor():
+    """Drop the pool so the next dispatch starts a new one"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+def shutdown_executor():
+    """
+    Stop dispatching jobs and let running ones finish (called on API shutdown).
+
+    Jobs that have not started yet are marked failed, since no process is left to run them.
+    """
+    global _dispatcher
+    with _dispatch_lock:
+        dispatcher, _dispatcher = _dispatcher, None
+    if dispatcher is not None:
+        _dispatch_stop.set()
+        _dispatch_wakeup.set()
+        dispatcher.join()
+        _dispatch_stop.clear()
+    with _dispatch_lock:
+        cancelled = list(_pending.items())
+        _pending.clear()
+    for job_id, (_, _, parameters) in cancelled:
+        JobHandle(job_id).fail(SHUTDOWN_MESSAGE, SHUTDOWN_MESSAGE)
+        _remove_spool(parameters)
+    # Cancelled pool futures are failed by _job_done
+    _reset_executor()
+
+# Jobs submitted by this API worker that still wait for a slot, in submission order, and the
+# number handed to the pool; only the dispatcher thread claims and submits jobs
+_pending: Dict[str, Tuple[str, Callable, Dict[str, Any]]] = {}
+_in_flight = 0
+_dispatch_lock = threading.Lock()
+_dispatch_wakeup = threading.Event()
+_dispatch_stop = threading.Event()
+_dispatcher: Optional[threading.Thread] = None
+
+def _dispatch_loop():
+    """Claim pending jobs as slots free up (locally or on other API workers) and hand them to the pool"""
+    last_heartbeat = time.monotonic()
+    while not _dispatch_stop.is_set():
+        _dispatch_wakeup.wait(JOB_POLL_INTERVAL)
+        _dispatch_wakeup.clear()
+        if _dispatch_stop.is_set():
+            break
+        try:
+            _dispatch_pending()
+            if time.monotonic() - last_heartbeat >= JOB_HEARTBEAT_INTERVAL:
+                _touch_pending()
+                last_heartbeat = time.monotonic()
+        except OperationalError as e:
+            print(f"Could not dispatch jobs, retrying: {e}")
+
+def _touch_pending():
+    """Heartbeat the jobs still waiting here, so other workers do not fail them as stale"""
+    with _dispatch_lock:
+        pending = list(_pending)
+    if not pending:
+        return
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id.in_(pending), BackgroundJob.status == "queued")
+            .values(heartbeat_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+def _dispatch_pending():
+    global _in_flight
+    with _dispatch_lock:
+        pending = list(_pending.items())
+        free = JOB_EXECUTOR_WORKERS - _in_flight
+    if not pending or free <= 0:
+        return
+
+    db = SessionLocal()
+    try:
+        _fail_stale_jobs(db)
+        blocked = set()
+        for job_id, (job_type, runner, parameters) in pending:
+            if free <= 0:
+                break
+            # Jobs of one type start in submission order
+            if job_type in blocked:
+                continue
+            if _claim(db, job_id, job_type):
+                with _dispatch_lock:
+                    del _pending[job_id]
+                    _in_flight += 1
+                free -= 1
+                get_executor().submit(_run, job_id, runner, parameters).add_done_callback(
+                    lambda future, job_id=job_id, parameters=parameters: _job_done(job_id, parameters, future)
+                )
+            elif db.query(BackgroundJob.status).filter(BackgroundJob.id == job_id).scalar() != "queued":
+                # Failed or removed while waiting
+                with _dispatch_lock:
+                    del _pending[job_id]
+                _remove_spool(parameters)
+            else:
+                blocked.add(job_type)
+    finally:
+        db.close()
+
+def _ensure_dispatcher():
+    global _dispatcher
+    with _dispatch_lock:
+        if _dispatcher is None:
+            _dispatcher = threading.Thread(target=_dispatch_loop, name="job-dispatcher", daemon=True)
+            _dispatcher.start()
+
+def submit_job(db: Session, job_type: str, runner: Callable, parameters: Dict[str, Any],
+               message: str = "Queued") -> str:
+    """
+    Record a queued job and schedule it on the job process pool.
+
+    The job is handed to a pool process once its type is below its concurrency limit,
+    so waiting jobs never occupy a worker. `runner(db, job, **parameters)` runs there
+    with its own session and reports through the JobHandle `job`; an exception marks
+    the job failed. The runner must be a module-level function and the parameters picklable.
+    A file named by the SPOOL_PARAMETER parameter is deleted if the job fails before it runs.
+    """
+    job_id = str(uuid.uuid4())
+    db.add(BackgroundJob(id=job_id, job_type=job_type, status="queued", progress=0.0,
+                         message=message, parameters=parameters, worker=WORKER_ID,
+                         heartbeat_at=datetime.utcnow()))
+    db.commit()
+    with _dispatch_lock:
+        _pending[job_id] = (job_type, runner, parameters)
+    _ensure_dispatcher()
+    _dispatch_wakeup.set()
+    return job_id
+
+def _job_done(job_id: str, parameters: Dict[str, Any], future):
+    """Free the job's slot and fail it if its pool process died (e.g. killed for memory) before it could report"""
+    global _in_flight
+    with _dispatch_lock:
+        _in_flight -= 1
+    if future.cancelled():
+        JobHandle(job_id).fail(SHUTDOWN_MESSAGE, SHUTDOWN_MESSAGE)
+        _remove_spool(parameters)
+        return
+    error = future.exception()
+    if error is not None:
+        JobHandle(job_id).fail(f"Job process failed: {error}", str(error))
+        _remove_spool(parameters)
+        if isinstance(error, BrokenProcessPool):
+            # Replace the broken pool on the next dispatch
+            _reset_executor()
+    _dispatch_wakeup.set()
+
+def _seconds(start: Optional[datetime], end: Optional[datetime]) -> Optional[float]:
+    if start is None or end is None:
+        return None
+    return round((end - start).total_seconds(), 3)
+
+def _job_dict(job: BackgroundJob) -> Dict[str, Any]:
+    now = datetime.utcnow()
+    return {
+        **(job.result or {}),
+        "job_id": job.id,
+        "job_type": job.job_type,
+        "status": job.status,
+        "progress": job.progress or 0.0,
+        "message": job.message or "",
+        "error": job.error,
+        "parameters": job.parameters,
+        "worker": job.worker,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "queued_seconds": _seconds(job.created_at, job.started_at or (now if job.status == "queued" else None)),
+        "run_seconds": _seconds(job.started_at, job.finished_at or (now if job.status == "running" else None))
+    }
+
+def get_job(db: Session, job_id: str, job_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Status, progress, timing and result of a job (optionally only if it has the given type)"""
+    query = db.query(BackgroundJob).filter(BackgroundJob.id == job_id)
+    if job_type:
+        query = query.filter(BackgroundJob.job_type == job_type)
+    job = query.first()
+    return _job_dict(job) if job else None
+
+def list_jobs(db: Session, job_type: Optional[str] = None, status: Optional[str] = None,
+              limit: int = 50) -> list:
+    """Most recent jobs, newest first"""
+    query = db.query(BackgroundJob)
+    if job_type:
+        query = query.filter(BackgroundJob.job_type == job_type)
+    if status:
+        query = query.filter(BackgroundJob.status == status)
+    return [_job_dict(job) for job in query.order_by(BackgroundJob.created_at.desc()).limit(limit)]
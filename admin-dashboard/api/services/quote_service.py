@@ -1,42 +1,150 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
-from typing import List, Optional, Dict, Any
-from models.quote import Quote, QuoteLanguage
-from difflib import SequenceMatcher
+from sqlalchemy import func, or_, and_, case, bindparam, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional, Dict, Any, Iterable, Iterator, Tuple, Callable
+from models.quote import Quote, QuoteLanguage, quote_content_hash
+from models.stats import QuoteStatistics, QuoteStatisticsState
+from services.duplicate_detection import cached_near_duplicates
+from services.search_index import ranked_matches
+from services.job_service import JobHandle, submit_job, get_job, SPOOL_PARAMETER
+from datetime import datetime, timedelta
+import tempfile
 import re
+import os
+
+# Materialised statistics are recomputed when a quote write bumped their version or after this many
+# seconds (which also keeps recent_additions current); "recent" means added in the last N days
+QUOTE_STATS_MAX_AGE = int(os.getenv("QUOTE_STATS_MAX_AGE", "300"))
+QUOTE_STATS_RECENT_DAYS = int(os.getenv("QUOTE_STATS_RECENT_DAYS", "7"))
+
+# Hashes per IN (...) lookup during bulk import; stays under SQLite's bound-parameter limit
+HASH_LOOKUP_BATCH_SIZE = 900
+
+# Quotes parsed, deduplicated and committed together; bounds import memory whatever the file size
+IMPORT_BATCH_SIZE = 5000
+
+# Uploads are copied here in UPLOAD_CHUNK_SIZE pieces for the import job to read back line by line
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", tempfile.gettempdir())
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Quote lines: "Quote text" — Author, or the quote files' Quote text — Author (any dash)
+QUOTE_LINE = re.compile(r'^(?:"(.+)"\s*|(.+)\s+)[—–-]\s*(.+)$')
+
+def _decode_line(raw: bytes) -> str:
+    """Decode an uploaded line as UTF-8, falling back to Windows-1252 (used by some quote files)"""
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw.decode("cp1252", errors="replace")
+
+def parse_quote_lines(lines: Iterable[str]) -> Iterator[Optional[Tuple[int, str, str]]]:
+    """Yield (line_number, text, author) per quote line and None per malformed line; blanks and # comments are skipped"""
+    for line_num, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        match = QUOTE_LINE.match(line)
+        if not match:
+            yield None
+            continue
+        quoted, unquoted, author = match.groups()
+        yield line_num, (quoted or unquoted).strip(), author.strip()
+
+def ensure_statistics_state(engine: Engine):
+    """Seed the quote_stats_state row (called on API startup); the first statistics request fills quote_stats"""
+    with engine.connect() as connection:
+        if connection.execute(QuoteStatisticsState.__table__.select()).first() is not None:
+            return
+        try:
+            connection.execute(QuoteStatisticsState.__table__.insert().values(id=1, version=1, refreshed_version=0))
+            connection.commit()
+        except IntegrityError:
+            # Another API worker seeded it first
+            connection.rollback()
 
 class QuoteService:
     def __init__(self, db: Session):
         self.db = db
     
     async def get_statistics(self) -> Dict[str, Any]:
-        """Get comprehensive quote statistics"""
-        total = self.db.query(Quote).count()
+        """Get comprehensive quote statistics from the materialised per-language counts"""
+        state = self.db.query(
+            QuoteStatisticsState.version, QuoteStatisticsState.refreshed_version, QuoteStatisticsState.refreshed_at
+        ).filter(QuoteStatisticsState.id == 1).first()
+        if (state is None or state.refreshed_version != state.version or state.refreshed_at is None
+                or (datetime.utcnow() - state.refreshed_at).total_seconds() > QUOTE_STATS_MAX_AGE):
+            rows = self._refresh_statistics(state.version if state else None)
+        else:
+            rows = self.db.query(QuoteStatistics).all()
         
-        # By language
-        lang_stats = self.db.query(
-            Quote.language, func.count(Quote.id)
-        ).group_by(Quote.language).all()
-        
-        # By sentiment
-        sentiment_stats = {
-            "positive": self.db.query(Quote).filter(Quote.sentiment_compound >= 0.05).count(),
-            "negative": self.db.query(Quote).filter(Quote.sentiment_compound <= -0.05).count(),
-            "neutral": self.db.query(Quote).filter(
-                Quote.sentiment_compound > -0.05, Quote.sentiment_compound < 0.05
-            ).count(),
-            "unknown": self.db.query(Quote).filter(Quote.sentiment_compound.is_(None)).count()
+        total = lambda field: sum(getattr(row, field) for row in rows)
+        return {
+            "total_quotes": total("total"),
+            "by_language": {QuoteLanguage[row.language].value: row.total for row in rows if row.language},
+            "by_sentiment": {
+                "positive": total("positive"),
+                "negative": total("negative"),
+                "neutral": total("neutral"),
+                "unknown": total("unknown")
+            },
+            "verified_count": total("verified"),
+            "recent_additions": total("recent")
         }
+    
+    def _refresh_statistics(self, version: Optional[int]) -> List[QuoteStatistics]:
+        """
+        Recompute every count in one aggregate pass over quotes and store it in quote_stats.
         
-        verified = self.db.query(Quote).filter(Quote.verified == True).count()
+        `version` is the statistics version read before counting. The counts are only marked
+        current if no quote write bumped it since, so a write committed during the refresh
+        leaves them stale for the next request.
+        """
+        compound = Quote.sentiment_compound
+        count_if = lambda condition: func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+        since = datetime.utcnow() - timedelta(days=QUOTE_STATS_RECENT_DAYS)
+        aggregates = self.db.query(
+            Quote.language,
+            func.count(Quote.id),
+            count_if(compound >= 0.05),
+            count_if(compound <= -0.05),
+            count_if(and_(compound > -0.05, compound < 0.05)),
+            count_if(compound.is_(None)),
+            count_if(Quote.verified == True),
+            count_if(Quote.created_at >= since)
+        ).group_by(Quote.language).all()
         
-        return {
-            "total_quotes": total,
-            "by_language": {lang.value: count for lang, count in lang_stats},
-            "by_sentiment": sentiment_stats,
-            "verified_count": verified,
-            "recent_additions": 0  # TODO: implement recent count
-        }
+        refreshed_at = datetime.utcnow()
+        rows = [
+            QuoteStatistics(
+                language=language.name if language else "",
+                total=total, positive=positive, negative=negative, neutral=neutral,
+                unknown=unknown, verified=verified, recent=recent
+            )
+            for language, total, positive, negative, neutral, unknown, verified, recent in aggregates
+        ]
+        try:
+            self.db.query(QuoteStatistics).delete()
+            self.db.add_all(rows)
+            self.db.execute(
+                update(QuoteStatisticsState)
+                .where(QuoteStatisticsState.id == 1, QuoteStatisticsState.version == version)
+                .values(refreshed_version=version, refreshed_at=refreshed_at)
+                .execution_options(synchronize_session=False)
+            )
+            self.db.commit()
+        except IntegrityError:
+            # Another request stored the same refresh first
+            self.db.rollback()
+        return rows
+    
+    def _mark_statistics_stale(self):
+        """Flag the materialised statistics for recomputation; call inside the writing transaction"""
+        self.db.query(QuoteStatisticsState).update(
+            {QuoteStatisticsState.version: QuoteStatisticsState.version + 1}, synchronize_session=False
+        )
     
     async def list_quotes(
         self, skip: int = 0, limit: int = 100, 
@@ -70,12 +178,17 @@ class QuoteService:
             query = query.filter(Quote.verified == verified)
         
         if search:
-            query = query.filter(
-                or_(
-                    Quote.text.ilike(f"%{search}%"),
-                    Quote.author.ilike(f"%{search}%")
+            matches = ranked_matches(self.db, search, language)
+            if matches is not None:
+                # Full-text index: best matches first
+                query = query.join(matches, Quote.id == matches.c.id).order_by(matches.c.rank, Quote.id)
+            else:
+                query = query.filter(
+                    or_(
+                        Quote.text.ilike(f"%{search}%"),
+                        Quote.author.ilike(f"%{search}%")
+                    )
                 )
-            )
         
         return query.offset(skip).limit(limit).all()
     
@@ -86,7 +199,9 @@ class QuoteService:
     async def create_quote(self, quote_data: Dict[str, Any]) -> Quote:
         """Create new quote"""
         quote = Quote(**quote_data)
+        quote.content_hash = quote_content_hash(quote.text, quote.author)
         self.db.add(quote)
+        self._mark_statistics_stale()
         self.db.commit()
         self.db.refresh(quote)
         return quote
@@ -99,6 +214,9 @@ class QuoteService:
         
         for field, value in update_data.items():
             setattr(quote, field, value)
+        if "text" in update_data or "author" in update_data:
+            quote.content_hash = quote_content_hash(quote.text, quote.author)
+        self._mark_statistics_stale()
         
         self.db.commit()
         self.db.refresh(quote)
@@ -111,72 +229,153 @@ class QuoteService:
             return False
         
         self.db.delete(quote)
+        self._mark_statistics_stale()
         self.db.commit()
         return True
     
     async def bulk_import(self, content: str, language: QuoteLanguage, source: str = None) -> Dict[str, int]:
-        """Bulk import quotes from text content"""
-        lines = content.strip().split('\n')
-        imported = 0
-        skipped = 0
-        errors = 0
+        """Bulk import quotes from text content, skipping quotes already stored or repeated in the payload"""
+        return self._import_quotes(parse_quote_lines(content.splitlines()), language, source)
+    
+    async def start_import(self, upload: UploadFile, language: QuoteLanguage, source: Optional[str] = None) -> str:
+        """Spool an uploaded quotes file to disk in chunks and start an import job for it"""
+        handle, path = tempfile.mkstemp(prefix="quote-import-", suffix=".txt", dir=UPLOAD_DIR)
+        try:
+            with os.fdopen(handle, "wb") as spool:
+                while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                    spool.write(chunk)
+            return submit_job(self.db, "import", run_bulk_import, {
+                SPOOL_PARAMETER: path,
+                "language": language.value,
+                "source": source
+            })
+        except Exception:
+            os.remove(path)
+            raise
+    
+    def _run_bulk_import(self, job: JobHandle, spool_path: str, language: str, source: Optional[str] = None):
+        """Import a spooled upload line by line, reporting progress through the job registry"""
+        try:
+            total_bytes = os.path.getsize(spool_path)
+            job.update(progress=0.0, message="Importing quotes...")
+            with open(spool_path, "rb") as upload:
+                report = lambda counts: job.update(
+                    progress=100.0 * upload.tell() / total_bytes if total_bytes else 100.0,
+                    message=f"Imported {counts['imported']} quotes ({counts['skipped']} skipped)",
+                    **counts
+                )
+                counts = self._import_quotes(
+                    parse_quote_lines(_decode_line(raw) for raw in upload),
+                    QuoteLanguage(language), source, on_batch=report
+                )
+            job.complete(
+                f"Imported {counts['imported']} quotes ({counts['skipped']} skipped, {counts['errors']} errors)",
+                **counts
+            )
+        except Exception as e:
+            self.db.rollback()
+            job.fail(f"Import failed: {str(e)}", str(e))
+        finally:
+            os.remove(spool_path)
+    
+    async def get_import_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get import job status"""
+        return get_job(self.db, job_id, "import")
+    
+    def _import_quotes(self, parsed: Iterable[Optional[Tuple[int, str, str]]], language: QuoteLanguage,
+                       source: Optional[str] = None,
+                       on_batch: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict[str, int]:
+        """Insert parsed quotes in committed batches of IMPORT_BATCH_SIZE, skipping known content hashes"""
+        counts = {"imported": 0, "skipped": 0, "errors": 0}
+        self._backfill_content_hashes()
         
-        for line_num, line in enumerate(lines, 1):
-            try:
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                
-                # Parse quote format: "Quote text" — Author
-                match = re.match(r'^"(.+)"\s*[—–-]\s*(.+)$', line)
-                if match:
-                    text, author = match.groups()
-                    
-                    # Check for duplicates
-                    existing = self.db.query(Quote).filter(
-                        Quote.text == text.strip(),
-                        Quote.author == author.strip()
-                    ).first()
-                    
-                    if existing:
-                        skipped += 1
-                        continue
-                    
-                    quote = Quote(
-                        text=text.strip(),
-                        author=author.strip(),
-                        language=language,
-                        source=source,
-                        file_source=source,
-                        line_number=line_num
-                    )
-                    self.db.add(quote)
-                    imported += 1
-                else:
-                    errors += 1
-            
-            except Exception:
-                errors += 1
+        rows = {}
+        for quote in parsed:
+            if quote is None:
+                counts["errors"] += 1
+                continue
+            line_num, text, author = quote
+            content_hash = quote_content_hash(text, author)
+            if content_hash in rows:
+                counts["skipped"] += 1
+                continue
+            rows[content_hash] = {
+                "text": text,
+                "author": author,
+                "language": language,
+                "source": source,
+                "file_source": source,
+                "line_number": line_num,
+                "content_hash": content_hash
+            }
+            if len(rows) >= IMPORT_BATCH_SIZE:
+                self._insert_new_quotes(rows, counts)
+                rows = {}
+                if on_batch:
+                    on_batch(counts)
         
+        self._insert_new_quotes(rows, counts)
+        return counts
+    
+    def _insert_new_quotes(self, rows: Dict[str, Dict[str, Any]], counts: Dict[str, int]):
+        """Insert the rows whose content hash is not stored yet with one executemany, then commit"""
+        # Earlier batches are committed, so repeats across batches are found here too
+        existing = self._existing_content_hashes(list(rows))
+        new_rows = [row for content_hash, row in rows.items() if content_hash not in existing]
+        if new_rows:
+            self.db.execute(Quote.__table__.insert(), new_rows)
+            self._mark_statistics_stale()
         self.db.commit()
-        return {"imported": imported, "skipped": skipped, "errors": errors}
+        counts["imported"] += len(new_rows)
+        counts["skipped"] += len(existing)
     
-    async def find_duplicates(self, threshold: float = 0.8) -> List[Dict]:
-        """Find potential duplicate quotes"""
-        quotes = self.db.query(Quote).all()
-        duplicates = []
-        
-        for i, quote1 in enumerate(quotes):
-            for quote2 in quotes[i+1:]:
-                similarity = SequenceMatcher(None, quote1.text, quote2.text).ratio()
-                if similarity >= threshold:
-                    duplicates.append({
-                        "quote1": {"id": quote1.id, "text": quote1.text, "author": quote1.author},
-                        "quote2": {"id": quote2.id, "text": quote2.text, "author": quote2.author},
-                        "similarity": similarity
-                    })
-        
-        return duplicates
+    def _existing_content_hashes(self, hashes: List[str]) -> set:
+        """Which of the given content hashes are already stored (indexed IN lookups)"""
+        existing = set()
+        for start in range(0, len(hashes), HASH_LOOKUP_BATCH_SIZE):
+            batch = hashes[start:start + HASH_LOOKUP_BATCH_SIZE]
+            existing.update(
+                content_hash for (content_hash,) in
+                self.db.query(Quote.content_hash).filter(Quote.content_hash.in_(batch))
+            )
+        return existing
+    
+    def _backfill_content_hashes(self):
+        """Hash quotes stored before the content_hash column existed"""
+        missing = self.db.query(Quote.id, Quote.text, Quote.author).filter(Quote.content_hash.is_(None)).all()
+        if missing:
+            self.db.execute(
+                Quote.__table__.update().where(Quote.__table__.c.id == bindparam("quote_id")),
+                [{"quote_id": quote_id, "content_hash": quote_content_hash(text, author)}
+                 for quote_id, text, author in missing]
+            )
+    
+    async def find_duplicates(self, threshold: float = 0.8, page: int = 1, page_size: int = 50) -> Dict[str, Any]:
+        """Find potential duplicate quotes, most similar pairs first, one page at a time"""
+        # Any insert, delete or edit changes the version and invalidates cached scans
+        version = tuple(self.db.query(
+            func.count(Quote.id), func.max(Quote.id), func.max(Quote.updated_at)
+        ).one())
+        load_quotes = lambda: self.db.query(Quote.id, Quote.text).order_by(Quote.id).all()
+        # The first scan of a corpus version takes seconds of CPU; keep it off the event loop
+        pairs = await run_in_threadpool(cached_near_duplicates, version, load_quotes, threshold)
+
+        page_pairs = pairs[(page - 1) * page_size:page * page_size]
+        ids = {quote_id for pair in page_pairs for quote_id in pair[:2]}
+        quotes = {
+            quote.id: {"id": quote.id, "text": quote.text, "author": quote.author}
+            for quote in self.db.query(Quote).filter(Quote.id.in_(ids))
+        } if ids else {}
+
+        return {
+            "total": len(pairs),
+            "page": page,
+            "page_size": page_size,
+            "duplicates": [
+                {"quote1": quotes[id1], "quote2": quotes[id2], "similarity": similarity}
+                for id1, id2, similarity in page_pairs
+            ]
+        }
     
     async def merge_duplicates(self, primary_id: int, duplicate_ids: List[int]) -> bool:
         """Merge duplicate quotes into primary quote"""
@@ -186,5 +385,10 @@ class QuoteService:
         
         # Delete duplicates
         self.db.query(Quote).filter(Quote.id.in_(duplicate_ids)).delete()
+        self._mark_statistics_stale()
         self.db.commit()
         return True
+
+def run_bulk_import(db: Session, job: JobHandle, **parameters):
+    """Job registry entry point for bulk imports"""
+    QuoteService(db)._run_bulk_import(job, **parameters)
@@ -0,0 +1,98 @@
+from sqlalchemy.engine import Engine, Connection
+from sqlalchemy import text, inspect
+import json
+import numpy as np
+
+from models.quote import quote_content_hash
+from services.vector_index import DENSE_DTYPE, SPARSE_DTYPE
+
+# Rows re-encoded per executemany batch
+MIGRATION_BATCH_SIZE = 1000
+
+def _encode_json_embedding(value) -> bytes:
+    """Blob form of an embedding stored as JSON: a dense list, or {"indices", "values"} for a sparse row"""
+    if isinstance(value, str):
+        value = json.loads(value)
+    if isinstance(value, dict):
+        pairs = np.empty(len(value["indices"]), dtype=SPARSE_DTYPE)
+        pairs["index"] = value["indices"]
+        pairs["value"] = value["values"]
+        return pairs.tobytes()
+    return np.asarray(value, dtype=DENSE_DTYPE).tobytes()
+
+def _reencode(connection: Connection, select_sql: str, update_sql: str):
+    """Re-encode the JSON embeddings returned by `select_sql` as blobs, in batches"""
+    rows = connection.execute(text(select_sql)).fetchall()
+    update = text(update_sql)
+    for start in range(0, len(rows), MIGRATION_BATCH_SIZE):
+        connection.execute(update, [
+            {"id": row_id, "embedding": _encode_json_embedding(embedding)}
+            for row_id, embedding in rows[start:start + MIGRATION_BATCH_SIZE]
+        ])
+    return len(rows)
+
+def ensure_vector_embedding_blobs(engine: Engine):
+    """
+    Convert QuoteVector embeddings written as JSON by older versions to float32 blobs.
+
+    create_all never alters an existing table. SQLite keeps the old column and only the
+    stored values need re-encoding (JSON rows are TEXT, blobs are BLOB); Postgres has a
+    json column, which is replaced by a bytea column holding the re-encoded values.
+    """
+    if "quote_vectors" not in inspect(engine).get_table_names():
+        return
+    dialect = engine.dialect.name
+    with engine.begin() as connection:
+        if dialect == "sqlite":
+            migrated = _reencode(
+                connection,
+                "SELECT id, embedding FROM quote_vectors WHERE typeof(embedding) = 'text'",
+                "UPDATE quote_vectors SET embedding = :embedding WHERE id = :id"
+            )
+        elif dialect == "postgresql":
+            data_type = connection.execute(text(
+                "SELECT data_type FROM information_schema.columns "
+                "WHERE table_name = 'quote_vectors' AND column_name = 'embedding'"
+            )).scalar()
+            if data_type not in ("json", "jsonb"):
+                return
+            connection.execute(text("ALTER TABLE quote_vectors ADD COLUMN embedding_blob bytea"))
+            migrated = _reencode(
+                connection,
+                "SELECT id, embedding FROM quote_vectors",
+                "UPDATE quote_vectors SET embedding_blob = :embedding WHERE id = :id"
+            )
+            connection.execute(text("ALTER TABLE quote_vectors DROP COLUMN embedding"))
+            connection.execute(text("ALTER TABLE quote_vectors RENAME COLUMN embedding_blob TO embedding"))
+            connection.execute(text("ALTER TABLE quote_vectors ALTER COLUMN embedding SET NOT NULL"))
+        else:
+            return
+    if migrated:
+        print(f"Re-encoded {migrated} JSON vector embeddings as float32 blobs")
+
+def ensure_quote_content_hash(engine: Engine):
+    """
+    Add the quotes.content_hash column and its index to databases created before it existed,
+    and hash the quotes stored without one.
+
+    Bulk import skips rows whose hash is already stored, so quotes without a hash would
+    be imported again. The column is nullable, so adding it needs no table rebuild.
+    """
+    if "quotes" not in inspect(engine).get_table_names():
+        return
+    with engine.begin() as connection:
+        columns = {column["name"] for column in inspect(connection).get_columns("quotes")}
+        if "content_hash" not in columns:
+            connection.execute(text("ALTER TABLE quotes ADD COLUMN content_hash VARCHAR(64)"))
+        connection.execute(text("CREATE INDEX IF NOT EXISTS ix_quotes_content_hash ON quotes (content_hash)"))
+        rows = connection.execute(text(
+            "SELECT id, text, author FROM quotes WHERE content_hash IS NULL"
+        )).fetchall()
+        update = text("UPDATE quotes SET content_hash = :content_hash WHERE id = :id")
+        for start in range(0, len(rows), MIGRATION_BATCH_SIZE):
+            connection.execute(update, [
+                {"id": row_id, "content_hash": quote_content_hash(quote_text, author)}
+                for row_id, quote_text, author in rows[start:start + MIGRATION_BATCH_SIZE]
+            ])
+    if rows:
+        print(f"Computed content hashes for {len(rows)} quotes")
@@ -0,0 +1,156 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy import text, Integer, Float
+from typing import Optional
+import re
+
+from models.quote import QuoteLanguage
+
+# Tokenisers per language. SQLite FTS5 only ships an English stemmer (porter), so the other
+# languages are indexed without stemming but still case- and accent-insensitive; Postgres
+# uses its Snowball text search configurations.
+FTS5_TOKENIZERS = {
+    QuoteLanguage.ENGLISH: "porter unicode61 remove_diacritics 2",
+    QuoteLanguage.SPANISH: "unicode61 remove_diacritics 2",
+    QuoteLanguage.PORTUGUESE: "unicode61 remove_diacritics 2",
+    QuoteLanguage.ITALIAN: "unicode61 remove_diacritics 2",
+}
+POSTGRES_CONFIGS = {
+    QuoteLanguage.ENGLISH: "english",
+    QuoteLanguage.SPANISH: "spanish",
+    QuoteLanguage.PORTUGUESE: "portuguese",
+    QuoteLanguage.ITALIAN: "italian",
+}
+
+# bm25 column weights: a match in the quote text counts more than one in the author
+TEXT_WEIGHT = 1.0
+AUTHOR_WEIGHT = 0.5
+
+# Whether the index exists (False e.g. on SQLite built without FTS5); None until ensure_search_index runs
+_available: Optional[bool] = None
+
+def _fts_table(language: QuoteLanguage) -> str:
+    return f"quotes_fts_{language.value}"
+
+def _postgres_config_expression(column: str = "language") -> str:
+    """SQL choosing the text search configuration from a quote's language"""
+    cases = " ".join(
+        f"WHEN '{language.name}' THEN '{config}'::regconfig" for language, config in POSTGRES_CONFIGS.items()
+    )
+    return f"CASE {column} {cases} ELSE 'simple'::regconfig END"
+
+def _sqlite_statements():
+    """FTS5 tables (one per language, external content on quotes) and the triggers keeping them in sync"""
+    statements = []
+    removals, additions = [], []
+    for language, tokenizer in FTS5_TOKENIZERS.items():
+        table = _fts_table(language)
+        name = language.name
+        statements += [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+            f"text, author, content='quotes', content_rowid='id', tokenize='{tokenizer}')",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_insert AFTER INSERT ON quotes "
+            f"WHEN new.language = '{name}' BEGIN "
+            f"INSERT INTO {table}(rowid, text, author) VALUES (new.id, new.text, new.author); END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_delete AFTER DELETE ON quotes "
+            f"WHEN old.language = '{name}' BEGIN "
+            f"INSERT INTO {table}({table}, rowid, text, author) VALUES ('delete', old.id, old.text, old.author); END",
+        ]
+        removals.append(
+            f"INSERT INTO {table}({table}, rowid, text, author) "
+            f"SELECT 'delete', old.id, old.text, old.author WHERE old.language = '{name}';"
+        )
+        additions.append(
+            f"INSERT INTO {table}(rowid, text, author) "
+            f"SELECT new.id, new.text, new.author WHERE new.language = '{name}';"
+        )
+    # One trigger so the old entry is always removed before the new one is added
+    statements.append(
+        "CREATE TRIGGER IF NOT EXISTS quotes_fts_update AFTER UPDATE OF text, author, language ON quotes BEGIN "
+        + " ".join(removals + additions) + " END"
+    )
+    return statements
+
+def ensure_search_index(engine: Engine):
+    """
+    Create the full-text index for quotes if it does not exist yet and fill it from the table.
+
+    SQLite gets per-language FTS5 tables maintained by triggers, so every write path
+    (ORM, Core bulk inserts, query deletes) keeps it in sync; Postgres gets a generated
+    tsvector column with a GIN index. Other databases fall back to LIKE search.
+    """
+    global _available
+    dialect = engine.dialect.name
+    try:
+        with engine.begin() as connection:
+            if dialect == "sqlite":
+                missing = [
+                    language for language in FTS5_TOKENIZERS
+                    if connection.execute(
+                        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                        {"name": _fts_table(language)}
+                    ).first() is None
+                ]
+                for statement in _sqlite_statements():
+                    connection.execute(text(statement))
+                # New tables start empty; index the quotes already stored
+                for language in missing:
+                    table = _fts_table(language)
+                    connection.execute(text(
+                        f"INSERT INTO {table}(rowid, text, author) "
+                        f"SELECT id, text, author FROM quotes WHERE language = :name"
+                    ), {"name": language.name})
+            elif dialect == "postgresql":
+                connection.execute(text(
+                    "ALTER TABLE quotes ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                    f"GENERATED ALWAYS AS (to_tsvector({_postgres_config_expression()}, "
+                    "coalesce(text, '') || ' ' || coalesce(author, ''))) STORED"
+                ))
+                connection.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_quotes_search_vector ON quotes USING gin (search_vector)"
+                ))
+        _available = dialect in ("sqlite", "postgresql")
+    except DBAPIError as e:
+        print(f"Full-text search index unavailable, falling back to LIKE search: {e}")
+        _available = False
+
+def _terms(search: str):
+    """Word terms of a search string; punctuation and query operators are dropped"""
+    return re.findall(r"\w+", search)
+
+def ranked_matches(db: Session, search: str, language: Optional[QuoteLanguage] = None):
+    """
+    Subquery of (id, rank) for quotes matching every term of `search`, the last term as a prefix.
+
+    Lower rank is a better match. Returns None when the database has no full-text index,
+    so the caller can fall back to LIKE filtering.
+    """
+    if _available is None:
+        ensure_search_index(db.get_bind())
+    if not _available:
+        return None
+    terms = _terms(search)
+    if not terms:
+        return None
+    languages = [language] if language else list(QuoteLanguage)
+
+    if db.get_bind().dialect.name == "sqlite":
+        # Quoted terms are matched literally; the trailing * makes the last one a prefix
+        match = " ".join(f'"{term}"' for term in terms[:-1])
+        match = f'{match} "{terms[-1]}"*'.strip()
+        sql = " UNION ALL ".join(
+            f"SELECT rowid AS id, bm25({table}, {TEXT_WEIGHT}, {AUTHOR_WEIGHT}) AS rank "
+            f"FROM {table} WHERE {table} MATCH :match"
+            for table in map(_fts_table, languages)
+        )
+        statement = text(sql).bindparams(match=match)
+    else:
+        query = " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+        statement = text(
+            f"SELECT id, -ts_rank(search_vector, to_tsquery({_postgres_config_expression()}, :query)) AS rank "
+            f"FROM quotes WHERE search_vector @@ to_tsquery({_postgres_config_expression()}, :query) "
+            "AND CAST(language AS TEXT) = ANY(:languages)"
+        ).bindparams(query=query, languages=[language.name for language in languages])
+
+    return statement.columns(id=Integer, rank=Float).subquery("search_matches")
@@ -1,23 +1,31 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List, Optional, Dict, Any
-from datetime import datetime
-import uuid
-import asyncio
-from fastapi import BackgroundTasks
+import time
 import os
 import sys
 
 # Add backend path for sentiment analysis
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', 'backend'))
 
-from models.quote import Quote
+from models.quote import Quote, QuoteLanguage
 from models.sentiment import SentimentResult
+from services.job_service import JobHandle, submit_job, get_job
+
+def _score_texts(texts: List[str], workers: Optional[int] = None) -> List[Dict[str, float]]:
+    """
+    Score texts with NLTK VADER through backend/sentiment.py, the engine the CLI uses.
+
+    There is deliberately no fallback analyzer: stored scores must not depend on which
+    VADER implementation happens to be installed.
+    """
+    from sentiment import score_parallel
+    # Jobs already run in a worker process, so only fan out further when asked to
+    return score_parallel(texts, workers=workers or 1)
 
 class SentimentService:
     def __init__(self, db: Session):
         self.db = db
-        self.jobs = {}  # In-memory job tracking (use Redis in production)
     
     async def get_statistics(self) -> Dict[str, Any]:
         """Get sentiment analysis statistics"""
@@ -62,29 +70,23 @@ class SentimentService:
             "distribution": distribution
         }
     
-    async def start_analysis(self, background_tasks: BackgroundTasks, 
-                           language: str = "en", force_reanalyze: bool = False) -> str:
+    async def start_analysis(self, language: str = "en", force_reanalyze: bool = False,
+                           workers: Optional[int] = None) -> str:
         """Start sentiment analysis job"""
-        job_id = str(uuid.uuid4())
-        
-        self.jobs[job_id] = {
-            "status": "running",
-            "progress": 0.0,
-            "message": "Starting sentiment analysis...",
-            "created_at": datetime.utcnow()
-        }
-        
-        background_tasks.add_task(
-            self._run_sentiment_analysis, job_id, language, force_reanalyze
-        )
-        
-        return job_id
+        return submit_job(self.db, "sentiment", run_sentiment_analysis, {
+            "language": language,
+            "force_reanalyze": force_reanalyze,
+            "workers": workers
+        })
     
-    async def _run_sentiment_analysis(self, job_id: str, language: str, force_reanalyze: bool):
-        """Background task to run sentiment analysis"""
+    def _run_sentiment_analysis(self, job: JobHandle, language: str, force_reanalyze: bool,
+                                workers: Optional[int] = None):
+        """Run sentiment analysis, reporting progress through the job registry"""
         try:
+            job.update(progress=0.0, message="Starting sentiment analysis...")
+            
             # Get quotes that need analysis
-            query = self.db.query(Quote).filter(Quote.language == language)
+            query = self.db.query(Quote).filter(Quote.language == QuoteLanguage(language))
             
             if not force_reanalyze:
                 # Only analyze quotes without sentiment results
@@ -95,86 +97,70 @@ class SentimentService:
             total_quotes = len(quotes)
             
             if total_quotes == 0:
-                self.jobs[job_id] = {
-                    "status": "completed",
-                    "progress": 100.0,
-                    "message": "No quotes to analyze",
-                    "completed_at": datetime.utcnow()
-                }
+                job.complete("No quotes to analyze")
                 return
             
-            # Import sentiment analysis (lazy import to avoid startup issues)
+            # Score the whole batch across worker processes (lazy import to avoid startup issues)
+            job.update(message=f"Scoring {total_quotes} quotes...")
+            started = time.perf_counter()
             try:
-                from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-                analyzer = SentimentIntensityAnalyzer()
-            except ImportError:
-                self.jobs[job_id] = {
-                    "status": "failed",
-                    "progress": 0.0,
-                    "message": "VADER sentiment analyzer not available",
-                    "error": "Missing vaderSentiment dependency"
-                }
+                all_scores = _score_texts([quote.text for quote in quotes], workers)
+            except (ImportError, LookupError) as e:
+                # ImportError: nltk or backend/sentiment.py missing; LookupError: vader_lexicon not installed
+                job.fail("NLTK VADER sentiment analyzer not available", str(e))
                 return
+            elapsed = time.perf_counter() - started
+            throughput = total_quotes / elapsed if elapsed > 0 else 0.0
+            job.update(progress=50.0, throughput=throughput)
+            
+            # Delete existing results if force reanalyze
+            if force_reanalyze:
+                self.db.query(SentimentResult).filter(
+                    SentimentResult.quote_id.in_([quote.id for quote in quotes])
+                ).delete(synchronize_session=False)
             
-            # Process quotes
-            for i, quote in enumerate(quotes):
+            # Store results
+            for i, (quote, scores) in enumerate(zip(quotes, all_scores)):
                 try:
-                    # Analyze sentiment
-                    scores = analyzer.polarity_scores(quote.text)
-                    
-                    # Delete existing result if force reanalyze
-                    if force_reanalyze:
-                        existing = self.db.query(SentimentResult).filter(
-                            SentimentResult.quote_id == quote.id
-                        ).first()
-                        if existing:
-                            self.db.delete(existing)
-                    
                     # Create new sentiment result
                     sentiment_result = SentimentResult(
                         quote_id=quote.id,
-                        positive=scores['pos'],
-                        negative=scores['neg'],
-                        neutral=scores['neu'],
-                        compound=scores['compound']
+                        positive_score=scores['pos'],
+                        negative_score=scores['neg'],
+                        neutral_score=scores['neu'],
+                        compound_score=scores['compound']
                     )
                     
                     self.db.add(sentiment_result)
                     
-                    # Update progress
-                    progress = (i + 1) / total_quotes * 100
-                    self.jobs[job_id]["progress"] = progress
-                    self.jobs[job_id]["message"] = f"Analyzed {i + 1}/{total_quotes} quotes"
-                    
-                    # Commit every 10 quotes
-                    if (i + 1) % 10 == 0:
+                    # Commit every 500 results
+                    if (i + 1) % 500 == 0:
                         self.db.commit()
+                        job.update(
+                            progress=50.0 + (i + 1) / total_quotes * 50,
+                            message=f"Saved {i + 1}/{total_quotes} results"
+                        )
                 
                 except Exception as e:
-                    print(f"Error analyzing quote {quote.id}: {e}")
+                    print(f"Error saving sentiment for quote {quote.id}: {e}")
                     continue
             
             # Final commit
             self.db.commit()
             
-            self.jobs[job_id] = {
-                "status": "completed",
-                "progress": 100.0,
-                "message": f"Successfully analyzed {total_quotes} quotes",
-                "completed_at": datetime.utcnow()
-            }
+            job.complete(
+                f"Successfully analyzed {total_quotes} quotes ({throughput:.0f} quotes/s)",
+                throughput=throughput,
+                analyzed=total_quotes
+            )
             
         except Exception as e:
-            self.jobs[job_id] = {
-                "status": "failed",
-                "progress": 0.0,
-                "message": f"Analysis failed: {str(e)}",
-                "error": str(e)
-            }
+            self.db.rollback()
+            job.fail(f"Analysis failed: {str(e)}", str(e))
     
     async def get_job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
         """Get job status"""
-        return self.jobs.get(job_id)
+        return get_job(self.db, job_id, "sentiment")
     
     async def get_distribution(self, language: Optional[str] = None, 
                              author: Optional[str] = None) -> Dict[str, Any]:
@@ -238,3 +224,7 @@ class SentimentService:
             })
         
         return {"quotes": quotes, "total": len(quotes)}
+
+def run_sentiment_analysis(db: Session, job: JobHandle, **parameters):
+    """Job registry entry point for sentiment analysis"""
+    SentimentService(db)._run_sentiment_analysis(job, **parameters)
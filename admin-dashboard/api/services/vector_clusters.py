@@ -0,0 +1,111 @@
+from sqlalchemy.orm import Session
+from typing import List, Optional, Dict, Tuple
+from collections import OrderedDict
+import threading
+import os
+import numpy as np
+
+from services.vector_index import SpaceMatrix, get_space_matrix
+
+# Spaces at least this large are clustered with MiniBatchKMeans instead of full KMeans
+MINIBATCH_MIN_SIZE = int(os.getenv("CLUSTER_MINIBATCH_MIN_SIZE", "10000"))
+
+# Fitted clusterings kept in memory, least recently used dropped first
+CLUSTER_CACHE_SIZE = int(os.getenv("CLUSTER_CACHE_SIZE", "8"))
+
+class ClusterModel:
+    """
+    k-means clustering of one vector space, with rows grouped by cluster and ordered by cosine distance to the centroid.
+
+    Rows without features (e.g. quotes whose every term was dropped from the TF-IDF
+    vocabulary) carry no signal, so they are left out of the fit and of every cluster.
+    """
+
+    def __init__(self, centroids: np.ndarray, quote_ids: np.ndarray, labels: np.ndarray,
+                 distances: np.ndarray, version: Tuple[int, int]):
+        self.centroids = centroids
+        self.quote_ids = quote_ids
+        self.labels = labels
+        self.distances = distances
+        self.version = version
+        self._group()
+
+    def _group(self):
+        """Sort clustered rows by (cluster, distance) so exemplars and members are contiguous slices"""
+        clustered = np.flatnonzero(self.labels >= 0)
+        self.order = clustered[np.lexsort((self.distances[clustered], self.labels[clustered]))]
+        self.counts = np.bincount(self.labels[clustered], minlength=len(self.centroids))
+        self.offsets = np.concatenate([[0], np.cumsum(self.counts)])
+        self.unclustered = len(self.labels) - len(clustered)
+
+    @classmethod
+    def fit(cls, space_matrix: SpaceMatrix, n_clusters: int) -> Optional["ClusterModel"]:
+        """Fit k-means (mini-batch for large spaces) on the non-empty dense features of a space"""
+        from sklearn.cluster import KMeans, MiniBatchKMeans
+
+        features = space_matrix.dense_features()
+        non_empty = np.flatnonzero(np.abs(features).max(axis=1) > 0) if len(features) else np.zeros(0, dtype=np.int64)
+        if len(non_empty) < n_clusters:
+            return None
+        if len(non_empty) >= MINIBATCH_MIN_SIZE:
+            kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, batch_size=2048, n_init=3)
+        else:
+            kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+        kmeans.fit(features[non_empty])
+
+        centroids = kmeans.cluster_centers_.astype(np.float32)
+        labels = np.full(len(features), -1, dtype=np.int64)
+        distances = np.ones(len(features), dtype=np.float32)
+        labels[non_empty], distances[non_empty] = cls._assign(centroids, features[non_empty])
+        return cls(centroids, space_matrix.quote_ids, labels, distances, space_matrix.version)
+
+    @staticmethod
+    def _assign(centroids: np.ndarray, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Most cosine-similar centroid and its cosine distance for every (unit-length) row"""
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        similarities = features @ (centroids / norms).T
+        labels = similarities.argmax(axis=1)
+        distances = 1.0 - similarities[np.arange(len(labels)), labels]
+        return labels.astype(np.int64), np.maximum(distances, 0).astype(np.float32)
+
+    def members(self, cluster_id: int, offset: int = 0, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """(quote_id, cosine distance) pairs of one cluster, nearest the centroid first"""
+        start = self.offsets[cluster_id] + offset
+        end = self.offsets[cluster_id + 1]
+        if limit is not None:
+            end = min(end, start + limit)
+        rows = self.order[start:end]
+        return [(int(self.quote_ids[row]), float(self.distances[row])) for row in rows]
+
+_cluster_models: "OrderedDict[Tuple[int, int], ClusterModel]" = OrderedDict()
+_cluster_models_lock = threading.Lock()
+# One lock per (space, n_clusters), so fitting one space does not hold up reads of the others
+_fit_locks: Dict[Tuple[int, int], threading.Lock] = {}
+
+def get_cluster_model(db: Session, vector_space_id: int, n_clusters: int) -> Optional[ClusterModel]:
+    """
+    Return the cached clustering of a space, fitting it on first use.
+
+    Fitting is CPU-bound; async callers should run this in a worker thread.
+    """
+    space_matrix = get_space_matrix(db, vector_space_id)
+    if len(space_matrix) < n_clusters:
+        return None
+
+    key = (vector_space_id, n_clusters)
+    with _cluster_models_lock:
+        fit_lock = _fit_locks.setdefault(key, threading.Lock())
+    with fit_lock:
+        model = _cluster_models.get(key)
+        if model is None or model.version != space_matrix.version:
+            model = ClusterModel.fit(space_matrix, n_clusters)
+            if model is None:
+                return None
+        with _cluster_models_lock:
+            _cluster_models[key] = model
+            _cluster_models.move_to_end(key)
+            while len(_cluster_models) > CLUSTER_CACHE_SIZE:
+                evicted, _ = _cluster_models.popitem(last=False)
+                _fit_locks.pop(evicted, None)
+        return model
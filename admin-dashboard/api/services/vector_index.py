@@ -0,0 +1,360 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from typing import List, Optional, Dict, Tuple, Any
+from collections import OrderedDict
+import threading
+import os
+import numpy as np
+from scipy import sparse
+
+from database import DATABASE_URL
+from models.vector import VectorSpace, QuoteVector
+
+def _default_index_dir() -> str:
+    """Keep ANN indexes next to the SQLite database file, or in the working directory otherwise"""
+    if DATABASE_URL.startswith("sqlite:///"):
+        db_path = DATABASE_URL[len("sqlite:///"):]
+        return os.path.join(os.path.dirname(db_path) or ".", "vector_indexes")
+    return "./vector_indexes"
+
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", _default_index_dir())
+
+# Spaces smaller than this are searched exactly; the brute-force matrix product is already fast
+ANN_MIN_SIZE = int(os.getenv("ANN_MIN_SIZE", "5000"))
+
+# Space matrices and ANN indexes kept in memory (least recently used dropped first); every
+# generation creates a new space, so an unbounded cache would grow for the life of the process
+SPACE_CACHE_SIZE = int(os.getenv("VECTOR_SPACE_CACHE_SIZE", "4"))
+
+# Dense dimensions a sparse space is reduced to (TruncatedSVD) for clustering and projection
+SVD_COMPONENTS = 100
+
+# Embedding blobs: dense rows are little-endian float32, sparse rows are (int32 column, float32 value) pairs
+DENSE_DTYPE = np.dtype("<f4")
+SPARSE_DTYPE = np.dtype([("index", "<i4"), ("value", "<f4")])
+
+def encode_dense_row(vector: np.ndarray) -> bytes:
+    """Storage form of one dense vector"""
+    return np.ascontiguousarray(vector, dtype=DENSE_DTYPE).tobytes()
+
+def encode_sparse_row(matrix: sparse.csr_matrix, row: int) -> bytes:
+    """Storage form of one CSR row: its non-zero (column, value) pairs"""
+    start, end = matrix.indptr[row], matrix.indptr[row + 1]
+    pairs = np.empty(end - start, dtype=SPARSE_DTYPE)
+    pairs["index"] = matrix.indices[start:end]
+    pairs["value"] = matrix.data[start:end]
+    return pairs.tobytes()
+
+def decode_dense_rows(blobs: List[bytes], dimensions: int) -> np.ndarray:
+    """Decode stored dense rows into one (n, dimensions) float32 matrix with a single frombuffer"""
+    return np.frombuffer(b"".join(blobs), dtype=DENSE_DTYPE).reshape(len(blobs), dimensions)
+
+def decode_sparse_rows(blobs: List[bytes], dimensions: int) -> sparse.csr_matrix:
+    """Assemble stored sparse rows back into one CSR matrix"""
+    indptr = np.zeros(len(blobs) + 1, dtype=np.int64)
+    np.cumsum([len(blob) // SPARSE_DTYPE.itemsize for blob in blobs], out=indptr[1:])
+    pairs = np.frombuffer(b"".join(blobs), dtype=SPARSE_DTYPE)
+    return sparse.csr_matrix(
+        (pairs["value"].astype(np.float32), pairs["index"].astype(np.int32), indptr),
+        shape=(len(blobs), dimensions)
+    )
+
+def reduce_sparse(matrix: sparse.spmatrix, n_components: int = SVD_COMPONENTS) -> np.ndarray:
+    """TruncatedSVD front-end: project a sparse matrix to row-normalised dense float32 features"""
+    from sklearn.decomposition import TruncatedSVD
+    from sklearn.preprocessing import normalize
+    
+    n_components = max(1, min(n_components, matrix.shape[1] - 1, matrix.shape[0] - 1))
+    reduced = TruncatedSVD(n_components=n_components, random_state=42).fit_transform(matrix)
+    return normalize(reduced).astype(np.float32)
+
+class SpaceMatrix:
+    """Pre-normalised float32 matrix (dense, or CSR for sparse spaces) of one vector space, for exact cosine top-k queries"""
+
+    def __init__(self, quote_ids: np.ndarray, vectors, version: Tuple[int, int]):
+        self.quote_ids = quote_ids
+        self.version = version
+        self.row_of = {int(quote_id): row for row, quote_id in enumerate(quote_ids)}
+        self.sparse = sparse.issparse(vectors)
+        self._dense_features = None
+
+        if self.sparse:
+            from sklearn.preprocessing import normalize
+            self.matrix = normalize(sparse.csr_matrix(vectors, dtype=np.float32))
+        else:
+            matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self.matrix = matrix / norms
+
+    def dense_features(self) -> np.ndarray:
+        """Dense rows for clustering and projection; sparse spaces go through TruncatedSVD once"""
+        if not self.sparse:
+            return self.matrix
+        if self._dense_features is None:
+            self._dense_features = reduce_sparse(self.matrix)
+        return self._dense_features
+
+    def __len__(self) -> int:
+        return len(self.quote_ids)
+
+    def top_k(self, query: np.ndarray, k: int, threshold: float = -1.0,
+              exclude_quote_id: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Return up to k (quote_id, cosine similarity) pairs, best first"""
+        if len(self) == 0 or k <= 0:
+            return []
+
+        if sparse.issparse(query):
+            # Sparse dot products: cost scales with the non-zeros, not the vocabulary size
+            norm = np.sqrt(query.multiply(query).sum())
+            if norm == 0:
+                return []
+            scores = np.asarray((self.matrix @ query.T).todense(), dtype=np.float32).ravel() / norm
+        else:
+            query = np.asarray(query, dtype=np.float32)
+            norm = np.linalg.norm(query)
+            if norm == 0:
+                return []
+            scores = np.asarray(self.matrix @ (query / norm), dtype=np.float32).ravel()
+
+        if exclude_quote_id is not None and exclude_quote_id in self.row_of:
+            scores[self.row_of[exclude_quote_id]] = -np.inf
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (int(self.quote_ids[row]), float(scores[row]))
+            for row in top if scores[row] >= threshold
+        ]
+
+# Process-wide LRU caches keyed by (space id, version), shared by all requests
+_space_matrices: "OrderedDict[Tuple[int, Tuple[int, int]], SpaceMatrix]" = OrderedDict()
+_ann_indexes: "OrderedDict[Tuple[int, Tuple[int, int]], IVFIndex]" = OrderedDict()
+_space_matrices_lock = threading.Lock()
+# Held while a space matrix is built, so concurrent cold requests decode it once
+_space_loading_lock = threading.Lock()
+
+def _cached(cache: OrderedDict, key):
+    """Cached value for key, marking it most recently used; None if absent"""
+    with _space_matrices_lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+def _cache(cache: OrderedDict, key, value):
+    """Store a value, dropping older versions of the same space and the least recently used entries"""
+    with _space_matrices_lock:
+        for stale in [k for k in cache if k[0] == key[0] and k != key]:
+            del cache[stale]
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > SPACE_CACHE_SIZE:
+            cache.popitem(last=False)
+
+def _space_version(db: Session, vector_space_id: int) -> Tuple[int, int]:
+    """Cheap fingerprint of a space's rows; changes whenever vectors are added or removed"""
+    count, max_id = db.query(
+        func.count(QuoteVector.id), func.max(QuoteVector.id)
+    ).filter(QuoteVector.vector_space_id == vector_space_id).one()
+    return int(count or 0), int(max_id or 0)
+
+def get_space_matrix(db: Session, vector_space_id: int) -> SpaceMatrix:
+    """Return the cached matrix of a vector space, rebuilding it if the space changed"""
+    version = _space_version(db, vector_space_id)
+    key = (vector_space_id, version)
+    cached = _cached(_space_matrices, key)
+    if cached is not None:
+        return cached
+
+    with _space_loading_lock:
+        cached = _cached(_space_matrices, key)
+        if cached is not None:
+            return cached
+
+        dimensions, parameters = db.query(VectorSpace.dimensions, VectorSpace.parameters).filter(
+            VectorSpace.id == vector_space_id
+        ).one()
+        rows = db.query(QuoteVector.quote_id, QuoteVector.embedding).filter(
+            QuoteVector.vector_space_id == vector_space_id
+        ).order_by(QuoteVector.id).all()
+
+        quote_ids = np.array([quote_id for quote_id, _ in rows], dtype=np.int64)
+        blobs = [embedding for _, embedding in rows]
+        if (parameters or {}).get("sparse"):
+            vectors = decode_sparse_rows(blobs, dimensions)
+        else:
+            vectors = decode_dense_rows(blobs, dimensions)
+
+        space_matrix = SpaceMatrix(quote_ids, vectors, version)
+        _cache(_space_matrices, key, space_matrix)
+        return space_matrix
+
+class IVFIndex:
+    """Inverted-file ANN index with a spherical k-means coarse quantizer over normalised vectors"""
+
+    def __init__(self, centroids: np.ndarray, list_offsets: np.ndarray, list_rows: np.ndarray,
+                 quote_ids: np.ndarray, matrix: np.ndarray, version: Tuple[int, int],
+                 n_probe: int = 8, recall: Optional[Dict[str, float]] = None):
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_rows = list_rows
+        self.quote_ids = quote_ids
+        self.matrix = matrix
+        self.version = version
+        self.n_probe = n_probe
+        self.recall = recall or {}
+        self.row_of = {int(quote_id): row for row, quote_id in enumerate(quote_ids)}
+
+    @classmethod
+    def build(cls, space_matrix: SpaceMatrix, n_lists: Optional[int] = None,
+              n_iter: int = 10, n_probe: int = 8, seed: int = 42) -> "IVFIndex":
+        """Cluster the space with k-means and bucket every row under its nearest centroid"""
+        matrix = space_matrix.matrix
+        n_rows = len(matrix)
+        n_lists = max(1, min(n_lists or int(np.sqrt(n_rows)), n_rows))
+        rng = np.random.default_rng(seed)
+
+        centroids = matrix[rng.choice(n_rows, n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            assignments = np.argmax(matrix @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, matrix)
+            counts = np.bincount(assignments, minlength=n_lists)
+            # Empty lists keep their previous centroid
+            filled = counts > 0
+            centroids[filled] = sums[filled]
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids /= norms
+
+        assignments = np.argmax(matrix @ centroids.T, axis=1)
+        list_rows = np.argsort(assignments, kind="stable")
+        list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=n_lists))])
+
+        return cls(centroids.astype(np.float32), list_offsets.astype(np.int64), list_rows.astype(np.int64),
+                   space_matrix.quote_ids, matrix, space_matrix.version, n_probe=min(n_probe, n_lists))
+
+    def search(self, query: np.ndarray, k: int, threshold: float = -1.0,
+               exclude_quote_id: Optional[int] = None,
+               n_probe: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Return up to k approximate (quote_id, cosine similarity) pairs, best first"""
+        query = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0 or k <= 0:
+            return []
+        query = query / norm
+
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        probes = np.argpartition(-(self.centroids @ query), n_probe - 1)[:n_probe]
+        candidates = np.concatenate([
+            self.list_rows[self.list_offsets[p]:self.list_offsets[p + 1]] for p in probes
+        ])
+        if exclude_quote_id is not None and exclude_quote_id in self.row_of:
+            candidates = candidates[candidates != self.row_of[exclude_quote_id]]
+        if len(candidates) == 0:
+            return []
+
+        scores = self.matrix[candidates] @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (int(self.quote_ids[candidates[i]]), float(scores[i]))
+            for i in top if scores[i] >= threshold
+        ]
+
+    def evaluate_recall(self, space_matrix: SpaceMatrix, k: int = 10, n_queries: int = 200,
+                        n_probe: Optional[int] = None, seed: int = 0) -> float:
+        """Mean recall@k of the index against exact search, using sampled rows as queries"""
+        n_rows = len(space_matrix)
+        if n_rows < 2:
+            return 1.0
+        rng = np.random.default_rng(seed)
+        rows = rng.choice(n_rows, min(n_queries, n_rows), replace=False)
+        hits = 0
+        total = 0
+        for row in rows:
+            quote_id = int(space_matrix.quote_ids[row])
+            exact = {qid for qid, _ in space_matrix.top_k(space_matrix.matrix[row], k, exclude_quote_id=quote_id)}
+            approx = {qid for qid, _ in self.search(space_matrix.matrix[row], k, exclude_quote_id=quote_id, n_probe=n_probe)}
+            hits += len(exact & approx)
+            total += len(exact)
+        return hits / total if total else 1.0
+
+    def save(self, path: str):
+        """Persist the index as a single .npz file"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            centroids=self.centroids, list_offsets=self.list_offsets, list_rows=self.list_rows,
+            quote_ids=self.quote_ids, matrix=self.matrix, version=np.array(self.version, dtype=np.int64),
+            n_probe=np.int64(self.n_probe),
+            recall_k=np.array(list(self.recall.keys())), recall_values=np.array(list(self.recall.values()))
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        """Load an index written by save()"""
+        with np.load(path) as data:
+            return cls(
+                data["centroids"], data["list_offsets"], data["list_rows"],
+                data["quote_ids"], data["matrix"], tuple(int(v) for v in data["version"]),
+                n_probe=int(data["n_probe"]),
+                recall=dict(zip(data["recall_k"].tolist(), data["recall_values"].tolist()))
+            )
+
+def index_path(vector_space_id: int) -> str:
+    """File of the ANN index of a vector space"""
+    return os.path.join(VECTOR_INDEX_DIR, f"space_{vector_space_id}.ivf.npz")
+
+def build_ann_index(db: Session, vector_space_id: int, n_lists: Optional[int] = None,
+                    n_probe: int = 8, k: int = 10) -> Dict[str, Any]:
+    """Build, evaluate and persist the ANN index of a vector space"""
+    space_matrix = get_space_matrix(db, vector_space_id)
+    if space_matrix.sparse:
+        return sparse_index_stats(len(space_matrix))
+    index = IVFIndex.build(space_matrix, n_lists=n_lists, n_probe=n_probe)
+    index.recall = {f"recall@{k}": index.evaluate_recall(space_matrix, k=k)}
+    index.save(index_path(vector_space_id))
+    _cache(_ann_indexes, (vector_space_id, index.version), index)
+    return get_ann_index_stats(index)
+
+def get_ann_index(db: Session, vector_space_id: int, min_size: int = 0) -> Optional[IVFIndex]:
+    """
+    Lazily load the persisted ANN index of a space; None if missing, built for an older
+    version, or the space has fewer than `min_size` rows (the index file is then not read)
+    """
+    version = _space_version(db, vector_space_id)
+    if version[0] < min_size:
+        return None
+    key = (vector_space_id, version)
+    index = _cached(_ann_indexes, key)
+    if index is None:
+        path = index_path(vector_space_id)
+        if not os.path.exists(path):
+            return None
+        index = IVFIndex.load(path)
+        if index.version != version:
+            return None
+        _cache(_ann_indexes, key, index)
+    return index
+
+def sparse_index_stats(size: int) -> Dict[str, Any]:
+    """Index summary of a sparse space: searched exactly, a sparse matrix-vector product only touches non-zeros"""
+    return {"type": "sparse-exact", "size": size}
+
+def get_ann_index_stats(index: IVFIndex) -> Dict[str, Any]:
+    """Summary of an ANN index for the API"""
+    list_sizes = np.diff(index.list_offsets)
+    return {
+        "type": "ivf",
+        "size": len(index.quote_ids),
+        "n_lists": len(index.centroids),
+        "n_probe": index.n_probe,
+        "mean_list_size": float(list_sizes.mean()) if len(list_sizes) else 0.0,
+        **index.recall
+    }
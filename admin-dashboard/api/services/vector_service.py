@@ -1,23 +1,54 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import List, Optional, Dict, Any
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
-import uuid
+import time
+import hashlib
 import numpy as np
-from fastapi import BackgroundTasks
+from scipy import sparse
 import os
 import sys
 
 # Add backend path for vector operations
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', 'backend'))
 
-from models.quote import Quote
+from models.quote import Quote, QuoteLanguage
 from models.vector import VectorSpace, QuoteVector
+from services.vector_index import (
+    get_space_matrix, get_ann_index, build_ann_index, get_ann_index_stats, sparse_index_stats, ANN_MIN_SIZE,
+    encode_dense_row, encode_sparse_row, reduce_sparse
+)
+from services.vector_clusters import get_cluster_model
+from services.job_service import JobHandle, submit_job, get_job
+
+# Rows per executemany batch when writing a vector space
+VECTOR_INSERT_BATCH_SIZE = 1000
+
+# Cached 2-D layouts, one file per algorithm and language so each generation extends the last one
+PROJECTION_CACHE_DIR = os.getenv("PROJECTION_CACHE_DIR", "./projections")
+
+def _project(algorithm: str, language: str, quotes: List[Quote], vectors) -> np.ndarray:
+    """Project a vector space to 2-D, keeping the cached positions of quotes laid out by earlier generations"""
+    try:
+        from projection import ProjectionCache
+    except ImportError:
+        from sklearn.manifold import TSNE
+        vector_array = reduce_sparse(vectors) if sparse.issparse(vectors) else np.asarray(vectors)
+        tsne = TSNE(n_components=2, random_state=42, perplexity=min(30, len(vector_array)-1))
+        return tsne.fit_transform(vector_array)
+    
+    # Keys change when a quote's text does, so edited quotes are placed again
+    keys = [
+        f"{quote.id}:{hashlib.sha1(quote.text.encode('utf-8')).hexdigest()[:16]}"
+        for quote in quotes
+    ]
+    cache_path = os.path.join(PROJECTION_CACHE_DIR, f"{algorithm}_{language}.npz")
+    return ProjectionCache(cache_path).project(vectors, keys=keys)
 
 class VectorService:
     def __init__(self, db: Session):
         self.db = db
-        self.jobs = {}  # In-memory job tracking
     
     async def list_vector_spaces(self) -> List[Dict[str, Any]]:
         """List all vector spaces"""
@@ -25,123 +56,121 @@ class VectorService:
         
         result = []
         for space in spaces:
-            quote_count = self.db.query(QuoteVector).filter(
-                QuoteVector.vector_space_id == space.id
-            ).count()
-            
+            # Recorded at generation time; a space is never modified afterwards
             result.append({
                 "id": space.id,
                 "name": space.name,
                 "algorithm": space.algorithm,
                 "dimensions": space.dimensions,
-                "quote_count": quote_count,
+                "quote_count": space.quote_count,
                 "created_at": space.created_at.isoformat()
             })
         
         return result
     
-    async def generate_vectors(self, background_tasks: BackgroundTasks,
-                             algorithm: str = "tfidf", max_features: int = 5000,
+    async def generate_vectors(self, algorithm: str = "tfidf", max_features: int = 5000,
                              language: str = "en") -> str:
         """Start vector generation job"""
-        job_id = str(uuid.uuid4())
-        
-        self.jobs[job_id] = {
-            "status": "running",
-            "progress": 0.0,
-            "message": "Starting vector generation...",
-            "created_at": datetime.utcnow()
-        }
-        
-        background_tasks.add_task(
-            self._run_vector_generation, job_id, algorithm, max_features, language
-        )
-        
-        return job_id
+        return submit_job(self.db, "vectors", run_vector_generation, {
+            "algorithm": algorithm,
+            "max_features": max_features,
+            "language": language
+        })
     
-    async def _run_vector_generation(self, job_id: str, algorithm: str, 
-                                   max_features: int, language: str):
-        """Background task to generate vectors"""
+    def _run_vector_generation(self, job: JobHandle, algorithm: str,
+                               max_features: int, language: str):
+        """Generate a vector space, reporting progress through the job registry"""
         try:
-            # Get quotes for the specified language
-            quotes = self.db.query(Quote).filter(Quote.language == language).all()
+            job.update(progress=0.0, message="Starting vector generation...")
+            
+            # Get quotes for the specified language (only the columns the generators need)
+            quotes = self.db.query(Quote.id, Quote.text).filter(
+                Quote.language == QuoteLanguage(language)
+            ).order_by(Quote.id).all()
             
             if not quotes:
-                self.jobs[job_id] = {
-                    "status": "failed",
-                    "progress": 0.0,
-                    "message": f"No quotes found for language: {language}",
-                    "error": "No data to process"
-                }
+                job.fail(f"No quotes found for language: {language}", "No data to process")
                 return
             
             # Create vector space
             space_name = f"{algorithm}_{language}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
             
             if algorithm == "tfidf":
-                vectors, dimensions = await self._generate_tfidf_vectors(
-                    quotes, max_features, job_id
+                vectors, dimensions = self._generate_tfidf_vectors(
+                    quotes, max_features, job
                 )
             elif algorithm == "word2vec":
-                vectors, dimensions = await self._generate_word2vec_vectors(
-                    quotes, job_id
+                vectors, dimensions = self._generate_word2vec_vectors(
+                    quotes, job
                 )
             elif algorithm == "bert":
-                vectors, dimensions = await self._generate_bert_vectors(
-                    quotes, job_id
+                vectors, dimensions = self._generate_bert_vectors(
+                    quotes, job
                 )
             else:
                 raise ValueError(f"Unsupported algorithm: {algorithm}")
             
-            # Create vector space record
+            # Generate visualization coordinates (t-SNE) before any write, so each row is written once
+            # and no transaction is open during the projection
+            coords_2d = self._generate_visualization_coords(algorithm, language, quotes, vectors, job)
+            
+            # The space and all of its rows are committed together: until then no reader sees the
+            # space, and a worker that dies mid-insert leaves nothing behind
+            job.update(progress=90.0, message=f"Saving {len(quotes)} vectors...")
+            insert_started = time.perf_counter()
             vector_space = VectorSpace(
                 name=space_name,
                 algorithm=algorithm,
                 dimensions=dimensions,
-                parameters={"max_features": max_features, "language": language}
+                parameters={
+                    "max_features": max_features,
+                    "language": language,
+                    "sparse": sparse.issparse(vectors)
+                },
+                quote_count=len(quotes)
             )
-            
             self.db.add(vector_space)
+            self.db.flush()
+            
+            # Core executemany batches; no job updates until the commit, since they would wait on
+            # this transaction's write lock
+            insert_vectors = QuoteVector.__table__.insert()
+            for start in range(0, len(quotes), VECTOR_INSERT_BATCH_SIZE):
+                rows = []
+                for i in range(start, min(start + VECTOR_INSERT_BATCH_SIZE, len(quotes))):
+                    if sparse.issparse(vectors):
+                        embedding = encode_sparse_row(vectors, i)
+                    else:
+                        embedding = encode_dense_row(vectors[i])
+                    rows.append({
+                        "quote_id": quotes[i].id,
+                        "vector_space_id": vector_space.id,
+                        "embedding": embedding,
+                        "x_coord": float(coords_2d[i, 0]) if coords_2d is not None else None,
+                        "y_coord": float(coords_2d[i, 1]) if coords_2d is not None else None
+                    })
+                self.db.execute(insert_vectors, rows)
             self.db.commit()
-            self.db.refresh(vector_space)
             
-            # Save quote vectors
-            for i, (quote, vector) in enumerate(zip(quotes, vectors)):
-                quote_vector = QuoteVector(
-                    quote_id=quote.id,
-                    vector_space_id=vector_space.id,
-                    vector=vector.tolist() if isinstance(vector, np.ndarray) else vector
-                )
-                self.db.add(quote_vector)
-                
-                if (i + 1) % 50 == 0:
-                    self.db.commit()
-                    progress = (i + 1) / len(quotes) * 90  # 90% for vector generation
-                    self.jobs[job_id]["progress"] = progress
-                    self.jobs[job_id]["message"] = f"Saved {i + 1}/{len(quotes)} vectors"
+            insert_seconds = time.perf_counter() - insert_started
             
-            self.db.commit()
-            
-            # Generate visualization coordinates (t-SNE)
-            await self._generate_visualization_coords(vector_space.id, vectors, job_id)
+            # Build the ANN index used by similarity search on large spaces
+            job.update(progress=95.0, message="Building similarity index...")
+            index_stats = build_ann_index(self.db, vector_space.id)
             
-            self.jobs[job_id] = {
-                "status": "completed",
-                "progress": 100.0,
-                "message": f"Generated {len(vectors)} vectors using {algorithm}",
-                "vector_space_id": vector_space.id,
-                "completed_at": datetime.utcnow()
-            }
+            job.complete(
+                f"Generated {len(quotes)} vectors using {algorithm}",
+                vector_space_id=vector_space.id,
+                insert_seconds=round(insert_seconds, 3),
+                index=index_stats
+            )
             
         except Exception as e:
-            self.jobs[job_id] = {
-                "status": "failed",
-                "progress": 0.0,
-                "message": f"Vector generation failed: {str(e)}",
-                "error": str(e)
-            }
+            # An uncommitted space is rolled back with its rows; a committed one is complete
+            self.db.rollback()
+            job.fail(f"Vector generation failed: {str(e)}", str(e))
     
-    async def _generate_tfidf_vectors(self, quotes: List[Quote], max_features: int, job_id: str):
+    def _generate_tfidf_vectors(self, quotes: List[Quote], max_features: int, job: JobHandle):
         """Generate TF-IDF vectors"""
         try:
             from sklearn.feature_extraction.text import TfidfVectorizer
@@ -149,8 +178,7 @@ class VectorService:
             
             texts = [quote.text for quote in quotes]
             
-            self.jobs[job_id]["message"] = "Fitting TF-IDF vectorizer..."
-            self.jobs[job_id]["progress"] = 10.0
+            job.update(progress=10.0, message="Fitting TF-IDF vectorizer...")
             
             vectorizer = TfidfVectorizer(
                 max_features=max_features,
@@ -160,160 +188,232 @@ class VectorService:
             )
             
             vectors = vectorizer.fit_transform(texts)
-            vectors = normalize(vectors, norm='l2')
+            vectors = normalize(vectors, norm='l2').astype(np.float32).tocsr()
             
-            return vectors.toarray(), vectors.shape[1]
+            # Kept sparse end to end; rows hold only their non-zero terms
+            return vectors, vectors.shape[1]
             
         except ImportError:
             raise ValueError("scikit-learn not available for TF-IDF generation")
     
-    async def _generate_word2vec_vectors(self, quotes: List[Quote], job_id: str):
-        """Generate Word2Vec vectors (simplified implementation)"""
-        # This is a placeholder - in production, you'd use gensim or similar
-        # For now, return random vectors as demonstration
-        dimensions = 300
-        vectors = np.random.rand(len(quotes), dimensions)
-        return vectors, dimensions
+    def _generate_engine_vectors(self, algorithm: str, quotes: List[Quote], job: JobHandle):
+        """Embed quotes with a local backend engine, reusing its on-disk embedding cache"""
+        try:
+            from embedding_engines import get_engine, embed_cached
+        except ImportError:
+            raise ValueError("Backend embedding engines not available")
+        
+        job.update(progress=10.0, message=f"Embedding quotes with {algorithm}...")
+        
+        try:
+            engine = get_engine(algorithm)
+            started = time.perf_counter()
+            vectors = embed_cached(engine, [quote.text for quote in quotes])
+        except (ImportError, OSError) as e:
+            raise ValueError(f"{algorithm} embedding engine not available: {e}")
+        
+        elapsed = time.perf_counter() - started
+        job.update(embedding_throughput=len(quotes) / elapsed if elapsed else None)
+        return vectors, vectors.shape[1]
+    
+    def _generate_word2vec_vectors(self, quotes: List[Quote], job: JobHandle):
+        """Generate word2vec-style vectors: averaged spaCy en_core_web_md static word vectors"""
+        return self._generate_engine_vectors("word2vec", quotes, job)
     
-    async def _generate_bert_vectors(self, quotes: List[Quote], job_id: str):
-        """Generate BERT vectors (simplified implementation)"""
-        # This is a placeholder - in production, you'd use transformers library
-        # For now, return random vectors as demonstration
-        dimensions = 768
-        vectors = np.random.rand(len(quotes), dimensions)
-        return vectors, dimensions
+    def _generate_bert_vectors(self, quotes: List[Quote], job: JobHandle):
+        """Generate BERT-style sentence vectors with the local ONNX transformer engine"""
+        return self._generate_engine_vectors("bert", quotes, job)
     
-    async def _generate_visualization_coords(self, vector_space_id: int, vectors, job_id: str):
-        """Generate t-SNE coordinates for visualization"""
+    def _generate_visualization_coords(self, algorithm: str, language: str, quotes: List[Quote],
+                                       vectors, job: JobHandle) -> Optional[np.ndarray]:
+        """Generate t-SNE coordinates for visualization, one row per vector (None if unavailable)"""
         try:
-            from sklearn.manifold import TSNE
+            job.update(progress=80.0, message="Generating visualization coordinates...")
             
-            self.jobs[job_id]["message"] = "Generating visualization coordinates..."
-            self.jobs[job_id]["progress"] = 95.0
-            
-            if isinstance(vectors, np.ndarray):
-                vector_array = vectors
-            else:
-                vector_array = np.array(vectors)
-            
-            # Use t-SNE for 2D visualization
-            tsne = TSNE(n_components=2, random_state=42, perplexity=min(30, len(vectors)-1))
-            coords_2d = tsne.fit_transform(vector_array)
-            
-            # Update quote vectors with visualization coordinates
-            quote_vectors = self.db.query(QuoteVector).filter(
-                QuoteVector.vector_space_id == vector_space_id
-            ).all()
-            
-            for i, qv in enumerate(quote_vectors):
-                qv.visualization_x = float(coords_2d[i, 0])
-                qv.visualization_y = float(coords_2d[i, 1])
-            
-            self.db.commit()
+            # Sparse spaces stay sparse: only a refit reduces them with TruncatedSVD
+            return _project(algorithm, language, quotes, vectors)
             
         except ImportError:
             print("scikit-learn not available for t-SNE visualization")
         except Exception as e:
             print(f"Error generating visualization coordinates: {e}")
+        return None
     
     async def find_similar_quotes(self, quote_id: int, limit: int = 10, 
                                 threshold: float = 0.5, 
                                 vector_space_id: Optional[int] = None):
         """Find quotes similar to the given quote"""
-        # Get the target quote vector
-        query = self.db.query(QuoteVector).filter(QuoteVector.quote_id == quote_id)
-        
-        if vector_space_id:
-            query = query.filter(QuoteVector.vector_space_id == vector_space_id)
-        else:
+        if not vector_space_id:
             # Use the most recent vector space
             latest_space = self.db.query(VectorSpace).order_by(
                 VectorSpace.created_at.desc()
             ).first()
             if not latest_space:
                 return []
-            query = query.filter(QuoteVector.vector_space_id == latest_space.id)
+            vector_space_id = latest_space.id
         
-        target_vector = query.first()
-        if not target_vector:
+        # Loading a space or its index from the database is seconds of CPU; keep it off the event loop
+        top = await run_in_threadpool(self._top_similar, vector_space_id, quote_id, limit, threshold)
+        if not top:
             return []
         
-        # Get all other vectors in the same space
-        other_vectors = self.db.query(QuoteVector, Quote).join(Quote).filter(
-            QuoteVector.vector_space_id == target_vector.vector_space_id,
-            QuoteVector.quote_id != quote_id
-        ).all()
-        
-        # Calculate similarities (cosine similarity)
-        target_vec = np.array(target_vector.vector)
-        similarities = []
+        quotes = {
+            quote.id: quote
+            for quote in self.db.query(Quote).filter(Quote.id.in_([qid for qid, _ in top])).all()
+        }
         
-        for qv, quote in other_vectors:
-            other_vec = np.array(qv.vector)
-            similarity = np.dot(target_vec, other_vec) / (
-                np.linalg.norm(target_vec) * np.linalg.norm(other_vec)
+        return [
+            {
+                "quote_id": qid,
+                "quote_text": quotes[qid].text,
+                "author": quotes[qid].author,
+                "similarity_score": score
+            }
+            for qid, score in top if qid in quotes
+        ]
+    
+    def _top_similar(self, vector_space_id: int, quote_id: int, limit: int, threshold: float) -> List[Tuple[int, float]]:
+        """(quote_id, cosine similarity) pairs most similar to a quote, best first"""
+        # Large spaces go through their ANN index when one is built for the current rows;
+        # below ANN_MIN_SIZE the index file is not even loaded
+        ann_index = get_ann_index(self.db, vector_space_id, min_size=ANN_MIN_SIZE)
+        if ann_index is not None:
+            row = ann_index.row_of.get(quote_id)
+            if row is None:
+                return []
+            return ann_index.search(
+                ann_index.matrix[row], limit, threshold=threshold, exclude_quote_id=quote_id
             )
-            
-            if similarity >= threshold:
-                similarities.append({
-                    "quote_id": quote.id,
-                    "quote_text": quote.text,
-                    "author": quote.author,
-                    "similarity_score": float(similarity)
-                })
         
-        # Sort by similarity and return top results
-        similarities.sort(key=lambda x: x["similarity_score"], reverse=True)
-        return similarities[:limit]
+        # Pre-normalised matrix of the space, cached across requests
+        space_matrix = get_space_matrix(self.db, vector_space_id)
+        row = space_matrix.row_of.get(quote_id)
+        if row is None:
+            return []
+        
+        # Cosine similarity is one matrix-vector product over normalised rows
+        return space_matrix.top_k(
+            space_matrix.matrix[row], limit, threshold=threshold, exclude_quote_id=quote_id
+        )
+    
+    async def get_job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get vector generation job status"""
+        return get_job(self.db, job_id, "vectors")
+    
+    async def get_index_stats(self, vector_space_id: int) -> Optional[Dict[str, Any]]:
+        """Get ANN index statistics (including recall@k) for a vector space"""
+        space = self.db.query(VectorSpace).filter(VectorSpace.id == vector_space_id).first()
+        if not space:
+            return None
+        if (space.parameters or {}).get("sparse"):
+            return sparse_index_stats(space.quote_count)
+        ann_index = get_ann_index(self.db, vector_space_id)
+        if ann_index is None:
+            return None
+        return get_ann_index_stats(ann_index)
+    
+    async def rebuild_index(self, vector_space_id: int, n_lists: Optional[int] = None,
+                            n_probe: int = 8, k: int = 10) -> Optional[Dict[str, Any]]:
+        """Rebuild the ANN index of a vector space with new parameters and report its recall"""
+        space = self.db.query(VectorSpace).filter(VectorSpace.id == vector_space_id).first()
+        if not space:
+            return None
+        # k-means and the recall evaluation are CPU-bound; keep them off the event loop
+        return await run_in_threadpool(
+            build_ann_index, self.db, vector_space_id, n_lists=n_lists, n_probe=n_probe, k=k
+        )
+    
+    def _resolve_space(self, vector_space_id: Optional[int]) -> Optional[VectorSpace]:
+        """The requested vector space, or the most recent one"""
+        if vector_space_id:
+            return self.db.query(VectorSpace).filter(VectorSpace.id == vector_space_id).first()
+        return self.db.query(VectorSpace).order_by(VectorSpace.created_at.desc()).first()
+    
+    def _quote_summaries(self, members: List[tuple]) -> List[Dict[str, Any]]:
+        """Quote fields for (quote_id, centroid distance) pairs, fetched in one query"""
+        quotes = {
+            quote.id: quote
+            for quote in self.db.query(Quote).filter(
+                Quote.id.in_([quote_id for quote_id, _ in members])
+            ).all()
+        }
+        return [
+            {
+                "quote_id": quote_id,
+                "text": quotes[quote_id].text,
+                "author": quotes[quote_id].author,
+                "language": quotes[quote_id].language,
+                "distance": distance
+            }
+            for quote_id, distance in members if quote_id in quotes
+        ]
     
     async def get_clusters(self, vector_space_id: Optional[int] = None, 
-                         n_clusters: int = 5):
-        """Get quote clusters from vector analysis"""
+                         n_clusters: int = 5, page: int = 1, page_size: int = 20,
+                         n_exemplars: int = 3) -> Optional[Dict[str, Any]]:
+        """Get a page of cluster summaries (size plus centroid-nearest exemplar quotes)"""
         try:
-            from sklearn.cluster import KMeans
-            
-            # Get vector space
-            if vector_space_id:
-                vector_space = self.db.query(VectorSpace).filter(
-                    VectorSpace.id == vector_space_id
-                ).first()
-            else:
-                vector_space = self.db.query(VectorSpace).order_by(
-                    VectorSpace.created_at.desc()
-                ).first()
-            
+            vector_space = self._resolve_space(vector_space_id)
             if not vector_space:
-                return []
+                return None
             
-            # Get vectors and quotes
-            vectors_data = self.db.query(QuoteVector, Quote).join(Quote).filter(
-                QuoteVector.vector_space_id == vector_space.id
-            ).all()
+            model = await run_in_threadpool(get_cluster_model, self.db, vector_space.id, n_clusters)
+            if model is None:
+                return None
             
-            if len(vectors_data) < n_clusters:
-                return []
+            # Largest clusters first
+            cluster_ids = np.argsort(-model.counts, kind="stable")
+            page_ids = cluster_ids[(page - 1) * page_size:page * page_size].tolist()
+            exemplars = {cluster_id: model.members(cluster_id, limit=n_exemplars) for cluster_id in page_ids}
+            summaries = self._quote_summaries([m for members in exemplars.values() for m in members])
+            by_quote = {summary["quote_id"]: summary for summary in summaries}
             
-            vectors = np.array([qv.vector for qv, _ in vectors_data])
+            return {
+                "vector_space_id": vector_space.id,
+                "n_clusters": n_clusters,
+                "total_quotes": len(model.quote_ids),
+                "unclustered_quotes": model.unclustered,
+                "page": page,
+                "page_size": page_size,
+                "clusters": [
+                    {
+                        "cluster_id": cluster_id,
+                        "size": int(model.counts[cluster_id]),
+                        "exemplars": [by_quote[quote_id] for quote_id, _ in exemplars[cluster_id] if quote_id in by_quote]
+                    }
+                    for cluster_id in page_ids
+                ]
+            }
             
-            # Perform clustering
-            kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-            cluster_labels = kmeans.fit_predict(vectors)
+        except ImportError:
+            return None
+    
+    async def get_cluster_members(self, cluster_id: int, vector_space_id: Optional[int] = None,
+                                  n_clusters: int = 5, page: int = 1,
+                                  page_size: int = 50) -> Optional[Dict[str, Any]]:
+        """Get a page of the quotes in one cluster, nearest the centroid first"""
+        try:
+            vector_space = self._resolve_space(vector_space_id)
+            if not vector_space:
+                return None
             
-            # Group quotes by cluster
-            clusters = {}
-            for i, (qv, quote) in enumerate(vectors_data):
-                cluster_id = int(cluster_labels[i])
-                if cluster_id not in clusters:
-                    clusters[cluster_id] = []
-                
-                clusters[cluster_id].append({
-                    "quote_id": quote.id,
-                    "text": quote.text,
-                    "author": quote.author,
-                    "language": quote.language
-                })
+            model = await run_in_threadpool(get_cluster_model, self.db, vector_space.id, n_clusters)
+            if model is None or cluster_id >= n_clusters:
+                return None
             
-            return [{"cluster_id": k, "quotes": v} for k, v in clusters.items()]
+            members = model.members(cluster_id, offset=(page - 1) * page_size, limit=page_size)
+            return {
+                "vector_space_id": vector_space.id,
+                "cluster_id": cluster_id,
+                "size": int(model.counts[cluster_id]),
+                "page": page,
+                "page_size": page_size,
+                "quotes": self._quote_summaries(members)
+            }
             
         except ImportError:
-            return []
+            return None
+
+def run_vector_generation(db: Session, job: JobHandle, **parameters):
+    """Job registry entry point for vector generation"""
+    VectorService(db)._run_vector_generation(job, **parameters)
@@ -0,0 +1,99 @@
+import asyncio
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, inspect, text
+
+from models.job import BackgroundJob
+from models.quote import Quote, QuoteLanguage, quote_content_hash
+from services import job_service, quote_service
+from services.quote_service import QuoteService
+from services.schema_migrations import ensure_quote_content_hash
+
+def _import(db, content: str):
+    return asyncio.run(QuoteService(db).bulk_import(content, QuoteLanguage.ENGLISH, source="test"))
+
+def test_bulk_import_skips_repeats_in_payload(db):
+    counts = _import(db, "\n".join([
+        "Know thyself — Socrates",
+        "know   THYSELF — socrates",
+        '"Carpe diem" — Horace',
+        "not a quote line",
+    ]))
+
+    assert counts == {"imported": 2, "skipped": 1, "errors": 1}
+    assert sorted(text for (text,) in db.query(Quote.text)) == ["Carpe diem", "Know thyself"]
+
+def test_bulk_import_skips_stored_quotes(db):
+    _import(db, "Know thyself — Socrates")
+    counts = _import(db, "Know thyself — Socrates\nAmor fati — Nietzsche")
+
+    assert counts == {"imported": 1, "skipped": 1, "errors": 0}
+    assert db.query(Quote).count() == 2
+
+def test_bulk_import_dedupes_across_batches(db, monkeypatch):
+    monkeypatch.setattr(quote_service, "IMPORT_BATCH_SIZE", 2)
+    lines = [f"Quote {i % 5} — Author" for i in range(12)]
+
+    counts = _import(db, "\n".join(lines))
+
+    assert counts == {"imported": 5, "skipped": 7, "errors": 0}
+    assert db.query(Quote).count() == 5
+
+def test_bulk_import_hashes_quotes_stored_without_one(db):
+    db.add(Quote(text="Know thyself", author="Socrates", language=QuoteLanguage.ENGLISH))
+    db.commit()
+
+    counts = _import(db, "Know thyself — Socrates")
+
+    assert counts == {"imported": 0, "skipped": 1, "errors": 0}
+    assert db.query(Quote.content_hash).scalar() == quote_content_hash("Know thyself", "Socrates")
+
+def test_content_hash_migration_on_old_schema(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE quotes (id INTEGER PRIMARY KEY, text TEXT NOT NULL, author VARCHAR(255) NOT NULL)"
+        ))
+        connection.execute(text("INSERT INTO quotes (text, author) VALUES ('Carpe diem', 'Horace')"))
+
+    ensure_quote_content_hash(engine)
+    ensure_quote_content_hash(engine)
+
+    assert "ix_quotes_content_hash" in {index["name"] for index in inspect(engine).get_indexes("quotes")}
+    with engine.connect() as connection:
+        stored = connection.execute(text("SELECT content_hash FROM quotes")).scalar()
+    assert stored == quote_content_hash("Carpe diem", "Horace")
+
+def _spooled_job(db, tmp_path, status: str, worker: str, heartbeat_at: datetime) -> BackgroundJob:
+    spool = tmp_path / f"quote-import-{status}-{worker}.txt"
+    spool.write_text("Know thyself — Socrates\n", encoding="utf-8")
+    job = BackgroundJob(id=spool.stem, job_type="import", status=status, worker=worker, heartbeat_at=heartbeat_at,
+                        parameters={job_service.SPOOL_PARAMETER: str(spool), "language": "en", "source": None})
+    db.add(job)
+    db.commit()
+    return job
+
+def test_jobs_failed_before_running_remove_their_upload(db, tmp_path):
+    old = datetime.utcnow() - timedelta(seconds=job_service.JOB_STALE_SECONDS + 60)
+    orphaned = _spooled_job(db, tmp_path, "queued", None, datetime.utcnow())
+    stale = _spooled_job(db, tmp_path, "running", "elsewhere:1", old)
+    alive = _spooled_job(db, tmp_path, "running", "elsewhere:2", datetime.utcnow())
+
+    job_service.fail_orphaned_jobs()
+
+    db.expire_all()
+    assert [job.status for job in (orphaned, stale, alive)] == ["failed", "failed", "running"]
+    assert sorted(path.name for path in tmp_path.iterdir()) == [f"{alive.id}.txt"]
+
+def test_cancelled_import_removes_its_upload(db, tmp_path, monkeypatch):
+    job = _spooled_job(db, tmp_path, "running", job_service.WORKER_ID, datetime.utcnow())
+    monkeypatch.setattr(job_service, "_in_flight", 1)
+    future = Future()
+    future.cancel()
+
+    job_service._job_done(job.id, job.parameters, future)
+
+    db.expire_all()
+    assert job.status == "failed"
+    assert not list(tmp_path.iterdir())
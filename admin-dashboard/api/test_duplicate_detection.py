@@ -0,0 +1,77 @@
+from difflib import SequenceMatcher
+from pathlib import Path
+import random
+
+import pytest
+
+from services.duplicate_detection import find_near_duplicates, lsh_bands, MIN_THRESHOLD, NUM_PERM
+
+QUOTES_FILE = Path(__file__).resolve().parents[2] / "quotes.txt"
+
+def _corpus(size: int = 250, edited: int = 150, seed: int = 7):
+    """Quotes from quotes.txt plus copies with a few words dropped, swapped or retyped"""
+    lines = [line.rsplit("—", 1)[0].strip() for line in QUOTES_FILE.read_text(encoding="utf-8", errors="replace").splitlines()]
+    texts = list(dict.fromkeys(line for line in lines if line))[:size]
+    rng = random.Random(seed)
+    for _ in range(edited):
+        words = rng.choice(texts).split()
+        for _ in range(rng.randint(1, 4)):
+            position = rng.randrange(len(words))
+            edit = rng.choice(("drop", "swap", "typo"))
+            if edit == "drop" and len(words) > 3:
+                del words[position]
+            elif edit == "swap" and position + 1 < len(words):
+                words[position], words[position + 1] = words[position + 1], words[position]
+            else:
+                words[position] = words[position][::-1]
+        texts.append(" ".join(words))
+    return list(enumerate(texts))
+
+def _brute_force(quotes, threshold: float):
+    """Every pair at or above the threshold, comparing in id order like the original full scan"""
+    pairs = {}
+    for i, (id1, text1) in enumerate(quotes):
+        for id2, text2 in quotes[i + 1:]:
+            # Both bounds are upper bounds of ratio(), so skipping on them loses nothing
+            if 2 * min(len(text1), len(text2)) < threshold * (len(text1) + len(text2)):
+                continue
+            matcher = SequenceMatcher(None, text1, text2)
+            if matcher.quick_ratio() >= threshold and matcher.ratio() >= threshold:
+                pairs[(id1, id2)] = matcher.ratio()
+    return pairs
+
+@pytest.fixture(scope="module")
+def corpus():
+    return _corpus()
+
+@pytest.fixture(scope="module")
+def expected_pairs(corpus):
+    return _brute_force(corpus, MIN_THRESHOLD)
+
+@pytest.mark.parametrize("threshold", [MIN_THRESHOLD, 0.8, 0.9])
+def test_minhash_matches_brute_force(corpus, expected_pairs, threshold):
+    expected = {pair: ratio for pair, ratio in expected_pairs.items() if ratio >= threshold}
+    found = {(id1, id2): similarity for id1, id2, similarity in find_near_duplicates(corpus, threshold)}
+
+    assert len(expected) > 20
+    assert all(expected.get(pair) == similarity for pair, similarity in found.items())
+    assert len(found) >= 0.95 * len(expected)
+
+def test_similarities_are_exact_and_sorted(corpus):
+    texts = dict(corpus)
+    found = find_near_duplicates(corpus, 0.8)
+
+    for id1, id2, similarity in found:
+        assert similarity == SequenceMatcher(None, texts[id1], texts[id2]).ratio()
+    assert [similarity for _, _, similarity in found] == sorted((s for _, _, s in found), reverse=True)
+
+def test_identical_texts_pair_with_every_copy():
+    quotes = [(1, "Carpe diem"), (2, "Know thyself"), (3, "Carpe diem"), (4, "Carpe diem")]
+
+    assert find_near_duplicates(quotes, 0.9) == [(1, 3, 1.0), (1, 4, 1.0), (3, 4, 1.0)]
+
+def test_lower_thresholds_use_more_bands():
+    bands = [lsh_bands(threshold) for threshold in (0.95, 0.9, 0.8, MIN_THRESHOLD)]
+
+    assert bands == sorted(bands)
+    assert all(1 <= count <= NUM_PERM for count in bands)
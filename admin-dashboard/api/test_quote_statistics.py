@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from database import engine, SessionLocal
+from models.quote import Quote, QuoteLanguage
+from services.quote_service import QuoteService, ensure_statistics_state
+
+def _statistics(db):
+    return asyncio.run(QuoteService(db).get_statistics())
+
+def _create(db, text: str):
+    return asyncio.run(QuoteService(db).create_quote({"text": text, "author": "Anon", "language": QuoteLanguage.ENGLISH}))
+
+@pytest.fixture
+def refreshes(db, monkeypatch):
+    """Versions passed to every statistics refresh, with the state row seeded as on startup"""
+    ensure_statistics_state(engine)
+    ensure_statistics_state(engine)
+    versions = []
+    refresh = QuoteService._refresh_statistics
+    def counted(self, version):
+        versions.append(version)
+        return refresh(self, version)
+    monkeypatch.setattr(QuoteService, "_refresh_statistics", counted)
+    return versions
+
+def test_empty_statistics_are_computed_once(db, refreshes):
+    assert _statistics(db)["total_quotes"] == 0
+    assert _statistics(db)["total_quotes"] == 0
+
+    assert refreshes == [1]
+
+def test_write_marks_statistics_stale(db, refreshes):
+    _statistics(db)
+    _create(db, "Know thyself")
+
+    assert _statistics(db)["total_quotes"] == 1
+    assert _statistics(db)["by_language"] == {"en": 1}
+    assert refreshes == [1, 2]
+
+def test_write_during_refresh_keeps_statistics_stale(db, refreshes, monkeypatch):
+    refresh = QuoteService._refresh_statistics
+    def racing(self, version):
+        # Another request commits a quote after this refresh read the version
+        other = SessionLocal()
+        try:
+            other.add(Quote(text="Carpe diem", author="Horace", language=QuoteLanguage.ENGLISH))
+            QuoteService(other)._mark_statistics_stale()
+            other.commit()
+        finally:
+            other.close()
+        return refresh(self, version)
+    with monkeypatch.context() as patched:
+        patched.setattr(QuoteService, "_refresh_statistics", racing)
+        _statistics(db)
+
+    assert _statistics(db)["total_quotes"] == 1
+    assert refreshes == [1, 2]
@@ -0,0 +1,138 @@
+import numpy as np
+import pytest
+
+from models.vector import VectorSpace, QuoteVector
+from services import vector_index
+from services.vector_index import SpaceMatrix, IVFIndex, encode_dense_row
+
+def _clustered_space(n_rows: int = 4000, dimensions: int = 64, n_clusters: int = 40, seed: int = 3) -> SpaceMatrix:
+    """Unit vectors scattered around random directions, like embeddings of related quotes"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dimensions))
+    vectors = centers[rng.integers(n_clusters, size=n_rows)] + 1.5 * rng.normal(size=(n_rows, dimensions))
+    return SpaceMatrix(np.arange(1, n_rows + 1, dtype=np.int64), vectors, (n_rows, n_rows))
+
+@pytest.fixture(scope="module")
+def space():
+    return _clustered_space()
+
+@pytest.fixture(scope="module")
+def index(space):
+    return IVFIndex.build(space, n_probe=8)
+
+def test_ivf_recall_against_exact_search(space, index):
+    assert index.evaluate_recall(space, k=10) >= 0.9
+
+def test_probing_every_list_is_exact(space, index):
+    assert index.evaluate_recall(space, k=10, n_probe=len(index.centroids)) == 1.0
+
+def test_more_probes_raise_recall(space, index):
+    recalls = [index.evaluate_recall(space, k=10, n_probe=n_probe) for n_probe in (1, 4, 16)]
+
+    assert recalls == sorted(recalls)
+    assert recalls[0] < 0.9 < recalls[-1]
+
+def test_search_matches_exact_scores(space, index):
+    query = space.matrix[0]
+    exact = dict(space.top_k(query, 50, exclude_quote_id=1))
+
+    for quote_id, similarity in index.search(query, 10, exclude_quote_id=1):
+        assert quote_id != 1
+        assert similarity == pytest.approx(exact.get(quote_id, similarity), abs=1e-5)
+
+def test_saved_index_answers_the_same(space, index, tmp_path):
+    path = str(tmp_path / "space.ivf.npz")
+    index.recall = {"recall@10": 0.95}
+    index.save(path)
+    loaded = IVFIndex.load(path)
+
+    assert loaded.recall == index.recall
+    assert loaded.version == index.version
+    for row in (0, 17, 999):
+        assert loaded.search(space.matrix[row], 10) == index.search(space.matrix[row], 10)
+
+def _add_space(db, n_rows: int, dimensions: int = 8, seed: int = 0) -> int:
+    rng = np.random.default_rng(seed)
+    space = VectorSpace(name="test", algorithm="bert", dimensions=dimensions, quote_count=n_rows)
+    db.add(space)
+    db.flush()
+    db.add_all(
+        QuoteVector(quote_id=quote_id, vector_space_id=space.id, embedding=encode_dense_row(vector))
+        for quote_id, vector in enumerate(rng.normal(size=(n_rows, dimensions)).astype(np.float32), 1)
+    )
+    db.commit()
+    return space.id
+
+@pytest.fixture
+def empty_caches(monkeypatch):
+    # Space ids restart with every test database, so nothing may carry over between tests
+    monkeypatch.setattr(vector_index, "_space_matrices", type(vector_index._space_matrices)())
+    monkeypatch.setattr(vector_index, "_ann_indexes", type(vector_index._ann_indexes)())
+
+def test_space_cache_keeps_recent_spaces_only(db, empty_caches, monkeypatch):
+    monkeypatch.setattr(vector_index, "SPACE_CACHE_SIZE", 2)
+    space_ids = [_add_space(db, 20, seed=seed) for seed in range(4)]
+
+    for space_id in space_ids:
+        vector_index.get_space_matrix(db, space_id)
+    first = vector_index.get_space_matrix(db, space_ids[-1])
+
+    assert [space_id for space_id, _ in vector_index._space_matrices] == space_ids[-2:]
+    assert vector_index.get_space_matrix(db, space_ids[-1]) is first
+
+def test_changed_space_replaces_its_cached_matrix(db, empty_caches):
+    space_id = _add_space(db, 20)
+    before = vector_index.get_space_matrix(db, space_id)
+    db.add(QuoteVector(quote_id=99, vector_space_id=space_id, embedding=encode_dense_row(np.ones(8, np.float32))))
+    db.commit()
+
+    after = vector_index.get_space_matrix(db, space_id)
+
+    assert len(after) == len(before) + 1
+    assert list(vector_index._space_matrices) == [(space_id, after.version)]
+
+def test_small_spaces_do_not_load_their_ann_index(db, empty_caches, monkeypatch):
+    space_id = _add_space(db, 50)
+    vector_index.build_ann_index(db, space_id, n_lists=4)
+    vector_index._ann_indexes.clear()
+
+    def load(path):
+        raise AssertionError("index loaded for a space below min_size")
+    with monkeypatch.context() as patched:
+        patched.setattr(IVFIndex, "load", load)
+        assert vector_index.get_ann_index(db, space_id, min_size=51) is None
+    assert len(vector_index._ann_indexes) == 0
+
+    index = vector_index.get_ann_index(db, space_id, min_size=50)
+    assert index is not None and len(index.quote_ids) == 50
+
+def test_killed_generation_leaves_no_space(db, empty_caches, monkeypatch):
+    from models.quote import Quote, QuoteLanguage
+    from services import vector_service
+    from services.job_service import JobHandle
+
+    words = ["light", "dark", "river", "stone", "wind", "fire", "time", "hope"]
+    db.add_all(Quote(text=f"{a} and {b}", author="Anon", language=QuoteLanguage.ENGLISH)
+               for a in words for b in words if a != b)
+    db.commit()
+    monkeypatch.setattr(vector_service, "VECTOR_INSERT_BATCH_SIZE", 10)
+    monkeypatch.setattr(vector_service.VectorService, "_generate_visualization_coords", lambda *args: None)
+
+    # The worker dies during the second insert batch, so no cleanup code runs
+    calls = []
+    def encode(vectors, i):
+        calls.append(i)
+        if len(calls) > 10:
+            raise KeyboardInterrupt
+        return vector_index.encode_sparse_row(vectors, i)
+    with monkeypatch.context() as patched:
+        patched.setattr(vector_service, "encode_sparse_row", encode)
+        with pytest.raises(KeyboardInterrupt):
+            vector_service.run_vector_generation(db, JobHandle("killed"), algorithm="tfidf", max_features=50, language="en")
+    db.rollback()
+    assert db.query(VectorSpace).count() == 0
+    assert db.query(QuoteVector).count() == 0
+
+    vector_service.run_vector_generation(db, JobHandle("complete"), algorithm="tfidf", max_features=50, language="en")
+    space = db.query(VectorSpace).one()
+    assert db.query(QuoteVector).filter(QuoteVector.vector_space_id == space.id).count() == space.quote_count == 56
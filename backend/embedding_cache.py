@@ -0,0 +1,156 @@
+import os
+import hashlib
+import unicodedata
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Shared by the CLI (tensor_vectors.py) and the admin API so both read and extend one cache
+EMBEDDING_CACHE_DIR = os.getenv(
+    'EMBEDDING_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vectors', 'cache')
+)
+
+
+def normalize_text(text):
+    """
+    Normalize a quote before hashing so whitespace and Unicode form changes still hit the cache.
+
+    Parameters:
+    text (str): The quote text.
+
+    Returns:
+    str: The NFC-normalized text with collapsed whitespace.
+    """
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+class EmbeddingCache:
+    """
+    Content-addressed on-disk cache of embeddings for one model.
+
+    Each entry is keyed by a SHA-1 of the model name and the normalized text. Keys are
+    appended to `<model>.keys` (one hex digest per line) and vectors to the headerless
+    float32 matrix `<model>.f32`, so the row of a key is its line number. Writers take
+    an exclusive lock on `<model>.lock`, so the CLI and the admin API can share a directory.
+    """
+
+    def __init__(self, model, dim, directory=EMBEDDING_CACHE_DIR):
+        self.model = model
+        self.dim = dim
+        self.directory = directory
+        self.keys_path = os.path.join(directory, f'{model}.keys')
+        self.matrix_path = os.path.join(directory, f'{model}.f32')
+        self.lock_path = os.path.join(directory, f'{model}.lock')
+        self._index = None
+
+    def key(self, text):
+        """Return the cache key of a text for this model."""
+        return hashlib.sha1(f"{self.model}\0{normalize_text(text)}".encode('utf-8')).hexdigest()
+
+    @contextmanager
+    def _locked(self):
+        """Hold an exclusive lock on the cache files, shared by every process using this directory."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.lock_path, 'a+b') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _read_index(self):
+        """
+        Map every cached key to its row, must be called with the lock held.
+
+        An interrupted store() can leave keys without vectors and a partial trailing
+        vector; both are truncated away so keys and rows stay aligned.
+        """
+        if not os.path.exists(self.keys_path):
+            return {}
+        row_size = 4 * self.dim
+        size = os.path.getsize(self.matrix_path) if os.path.exists(self.matrix_path) else 0
+        with open(self.keys_path, 'r') as keys_file:
+            keys = [line.strip() for line in keys_file]
+        rows = min(size // row_size, len(keys))
+        if len(keys) > rows:
+            keys = keys[:rows]
+            with open(self.keys_path, 'w') as keys_file:
+                keys_file.write(''.join(f"{key}\n" for key in keys))
+        if size != rows * row_size:
+            with open(self.matrix_path, 'r+b') as matrix_file:
+                matrix_file.truncate(rows * row_size)
+        return {key: row for row, key in enumerate(keys)}
+
+    def _load_index(self):
+        """Map every cached key to its row, reading the key file on first use."""
+        if self._index is None:
+            if not os.path.exists(self.keys_path):
+                return {}
+            with self._locked():
+                self._index = self._read_index()
+        return self._index
+
+    def __len__(self):
+        return len(self._load_index())
+
+    def lookup(self, texts):
+        """
+        Fetch cached embeddings for a list of texts.
+
+        Parameters:
+        texts (list): The texts to look up.
+
+        Returns:
+        tuple: (float32 matrix with a row per text, filled for hits and zero for misses,
+            list of indices of the texts that were not cached).
+        """
+        index = self._load_index()
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        keys = [self.key(text) for text in texts]
+        rows = [index.get(key) for key in keys]
+        hits = [i for i, row in enumerate(rows) if row is not None]
+        if hits:
+            # Other processes may have appended rows since the index was read; map only the known ones
+            matrix = np.memmap(self.matrix_path, dtype='<f4', mode='r', shape=(len(index), self.dim))
+            vectors[hits] = matrix[[rows[i] for i in hits]]
+        return vectors, [i for i, row in enumerate(rows) if row is None]
+
+    def store(self, texts, vectors):
+        """
+        Append embeddings for texts that are not cached yet.
+
+        Parameters:
+        texts (list): The embedded texts.
+        vectors (numpy.ndarray): Their embeddings, one row per text.
+        """
+        with self._locked():
+            # Re-read under the lock to pick up rows other processes stored meanwhile
+            index = self._index = self._read_index()
+            new_keys, new_rows = [], []
+            for text, vector in zip(texts, vectors):
+                key = self.key(text)
+                if key in index:
+                    continue
+                index[key] = len(index)
+                new_keys.append(key)
+                new_rows.append(vector)
+            if not new_keys:
+                return
+            # Keys first: a key without a vector row is dropped when the index is read
+            with open(self.keys_path, 'a') as keys_file:
+                keys_file.write(''.join(f"{key}\n" for key in new_keys))
+            with open(self.matrix_path, 'ab') as matrix_file:
+                matrix_file.write(np.asarray(new_rows, dtype='<f4').tobytes())
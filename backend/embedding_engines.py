@@ -0,0 +1,250 @@
+import os
+import sys
+import time
+import logging
+import argparse
+import numpy as np
+from embedding_cache import EmbeddingCache, EMBEDDING_CACHE_DIR
+
+SPACY_MODEL = "en_core_web_md"
+# Pipeline components that do not contribute to doc.vector (static word vectors)
+UNUSED_COMPONENTS = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner", "senter"]
+
+# Local directory holding model.onnx and tokenizer.json for the transformer engine
+TRANSFORMER_MODEL_DIR = os.getenv(
+    'TRANSFORMER_MODEL_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'minilm')
+)
+
+_nlp = None
+
+def get_nlp():
+    """
+    Load the spaCy model once, without the components that embedding does not use.
+
+    Returns:
+    spacy.language.Language: The shared spaCy pipeline.
+    """
+    global _nlp
+    if _nlp is None:
+        import spacy
+        _nlp = spacy.load(SPACY_MODEL, exclude=UNUSED_COMPONENTS)
+    return _nlp
+
+
+class SpacyEngine:
+    """
+    Averaged static word vectors (word2vec-style) from the spaCy model.
+
+    doc.vector is the mean of the token vectors, so only the tokenizer and the vector
+    table are needed; texts go through nlp.pipe in batches.
+    """
+
+    def __init__(self, batch_size=256, n_process=1):
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.name = SPACY_MODEL
+
+    @property
+    def dim(self):
+        return get_nlp().vocab.vectors_length
+
+    def embed(self, texts):
+        """
+        Embed texts with spaCy's batched nlp.pipe.
+
+        Parameters:
+        texts (list): The texts to embed.
+
+        Returns:
+        numpy.ndarray: A float32 matrix with one row per text.
+        """
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        docs = get_nlp().pipe(texts, batch_size=self.batch_size, n_process=self.n_process)
+        for i, doc in enumerate(docs):
+            vectors[i] = doc.vector
+        return vectors
+
+
+class TransformerEngine:
+    """
+    CPU-only sentence transformer run through ONNX Runtime from local model files.
+
+    `model_dir` must contain `model.onnx` (a BERT-style encoder exported with
+    input_ids/attention_mask inputs) and the matching Hugging Face `tokenizer.json`.
+    Token embeddings are mean-pooled over the attention mask and L2-normalised.
+    Nothing is downloaded.
+    """
+
+    def __init__(self, model_dir=TRANSFORMER_MODEL_DIR, batch_size=32, max_length=128, threads=None):
+        self.model_dir = model_dir
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.threads = threads
+        self.name = f"onnx-{os.path.basename(os.path.normpath(model_dir))}"
+        self._session = None
+        self._tokenizer = None
+        self._dim = None
+
+    def _load(self):
+        if self._session is not None:
+            return
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_path = os.path.join(self.model_dir, 'model.onnx')
+        tokenizer_path = os.path.join(self.model_dir, 'tokenizer.json')
+        for path in (model_path, tokenizer_path):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Transformer model file not found: {path}")
+
+        options = onnxruntime.SessionOptions()
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+        self._session = onnxruntime.InferenceSession(
+            model_path, sess_options=options, providers=['CPUExecutionProvider']
+        )
+        self._inputs = {model_input.name for model_input in self._session.get_inputs()}
+        self._tokenizer = Tokenizer.from_file(tokenizer_path)
+        self._tokenizer.enable_truncation(max_length=self.max_length)
+        self._tokenizer.enable_padding()
+
+    @property
+    def dim(self):
+        if self._dim is None:
+            self._dim = self._encode(["dimension probe"]).shape[1]
+        return self._dim
+
+    def _encode(self, texts):
+        self._load()
+        encodings = self._tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._inputs:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        token_embeddings = self._session.run(None, feeds)[0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (pooled / norms).astype(np.float32)
+
+    def embed(self, texts):
+        """
+        Embed texts in batches of `batch_size`.
+
+        Parameters:
+        texts (list): The texts to embed.
+
+        Returns:
+        numpy.ndarray: A float32 matrix with one row per text.
+        """
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        # Similar lengths in a batch keep padding (and wasted attention) small
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            vectors[batch] = self._encode([texts[i] for i in batch])
+        return vectors
+
+
+ENGINES = {
+    'word2vec': SpacyEngine,
+    'bert': TransformerEngine,
+}
+
+def get_engine(algorithm, **options):
+    """
+    Create the embedding engine for an algorithm name.
+
+    Parameters:
+    algorithm (str): 'word2vec' (averaged spaCy static vectors) or 'bert' (local ONNX transformer).
+    **options: Engine-specific options such as batch_size.
+
+    Returns:
+    SpacyEngine or TransformerEngine: The engine.
+    """
+    if algorithm not in ENGINES:
+        raise ValueError(f"Unsupported embedding algorithm: {algorithm}")
+    return ENGINES[algorithm](**options)
+
+def embed_cached(engine, texts, cache=None):
+    """
+    Embed texts with an engine, only running the ones missing from the cache.
+
+    Parameters:
+    engine (SpacyEngine or TransformerEngine): The embedding engine.
+    texts (list): The texts to embed.
+    cache (EmbeddingCache): Optional cache; defaults to one per engine in EMBEDDING_CACHE_DIR. Pass False to disable.
+
+    Returns:
+    numpy.ndarray: A float32 matrix with one row per text.
+    """
+    if cache is False:
+        return engine.embed(texts)
+    if cache is None:
+        cache = EmbeddingCache(engine.name, engine.dim, directory=EMBEDDING_CACHE_DIR)
+
+    vectors, missing = cache.lookup(texts)
+    logging.info(f"Embedding cache ({engine.name}): {len(texts) - len(missing)} hits, {len(missing)} misses")
+    if missing:
+        missing_texts = [texts[i] for i in missing]
+        vectors[missing] = engine.embed(missing_texts)
+        cache.store(missing_texts, vectors[missing])
+    return vectors
+
+def benchmark(texts, algorithms=('word2vec', 'bert'), batch_size=None):
+    """
+    Measure uncached embedding throughput of each engine.
+
+    Parameters:
+    texts (list): The texts to embed.
+    algorithms (tuple): Engine names to benchmark.
+    batch_size (int): Optional batch size passed to every engine.
+
+    Returns:
+    dict: Per algorithm, quotes per second, seconds and dimension (or the error if the engine is unavailable).
+    """
+    results = {}
+    for algorithm in algorithms:
+        options = {'batch_size': batch_size} if batch_size else {}
+        try:
+            engine = get_engine(algorithm, **options)
+            engine.dim  # Load the model outside the timed section
+            started = time.perf_counter()
+            engine.embed(texts)
+            seconds = time.perf_counter() - started
+            results[algorithm] = {
+                'quotes_per_second': len(texts) / seconds if seconds else float('inf'),
+                'seconds': seconds,
+                'dim': engine.dim,
+            }
+        except (ImportError, OSError) as error:
+            results[algorithm] = {'error': str(error)}
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the local embedding engines.")
+    parser.add_argument('file', nargs='?', default='../quotes.txt', help="Quotes file (quote — author per line).")
+    parser.add_argument('--algorithms', nargs='+', default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument('--limit', type=int, default=2000, help="Number of quotes to embed.")
+    parser.add_argument('--batch-size', type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.file, 'r', encoding='utf-8', errors='replace') as quotes_file:
+        texts = [line.rsplit("—", 1)[0].strip() for line in quotes_file if line.strip()][:args.limit]
+
+    for algorithm, result in benchmark(texts, args.algorithms, args.batch_size).items():
+        if 'error' in result:
+            print(f"{algorithm}: unavailable ({result['error']})")
+        else:
+            print(f"{algorithm}: {result['quotes_per_second']:.0f} quotes/sec "
+                  f"({len(texts)} quotes in {result['seconds']:.2f}s, dim {result['dim']})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
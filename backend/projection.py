@@ -0,0 +1,211 @@
+import os
+import hashlib
+import logging
+import numpy as np
+
+
+class ProjectionCache:
+    """
+    2-D layout of a vector space with cached coordinates.
+
+    A full fit reduces the vectors with IncrementalPCA (fed in batches, so memory stays
+    bounded) and lays them out with Barnes-Hut t-SNE. The PCA basis, the reduced vectors
+    and the 2-D coordinates are saved to `path`. When the same space later grows, only
+    the new rows are projected: each is placed at the distance-weighted mean of its
+    nearest neighbours in the existing layout. A full refit happens once the placed rows
+    exceed `refit_fraction` of the fitted layout.
+
+    Passing `keys` to project() matches rows to the cached layout by key instead of by
+    position, for callers that re-embed the whole corpus each time (see project).
+    """
+
+    def __init__(self, path, n_components=50, perplexity=30.0, neighbours=10,
+                 refit_fraction=0.2, batch_size=1024, random_state=42, sparse_components=100):
+        self.path = path
+        self.n_components = n_components
+        self.sparse_components = sparse_components
+        self.perplexity = perplexity
+        self.neighbours = neighbours
+        self.refit_fraction = refit_fraction
+        self.batch_size = batch_size
+        self.random_state = random_state
+
+    @staticmethod
+    def fingerprint(vectors):
+        """Hash the raw bytes of a vector matrix."""
+        return hashlib.sha1(np.ascontiguousarray(vectors, dtype=np.float32).tobytes()).hexdigest()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with np.load(self.path) as cached:
+                return {key: cached[key] for key in cached.files}
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, state):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp.npz"
+        np.savez(tmp_path, **state)
+        os.replace(tmp_path, self.path)
+
+    def project(self, vectors, keys=None):
+        """
+        Return 2-D coordinates for every row of `vectors`.
+
+        Without keys, rows previously projected must come first and be unchanged. With
+        keys, each row keeps the cached coordinates of its key and rows with new keys are
+        placed next to their most cosine-similar known rows in `vectors` itself, so the
+        vectors may be re-embedded (e.g. a refitted TF-IDF vocabulary), reordered or
+        have rows removed between calls.
+
+        Parameters:
+        vectors (numpy.ndarray): The vector matrix; with keys it may also be a scipy sparse matrix.
+        keys (list): Optional stable identifier of each row, e.g. a quote id and a hash of its text.
+
+        Returns:
+        numpy.ndarray: A float32 (N, 2) matrix of coordinates.
+        """
+        if keys is not None:
+            return self._project_keyed(vectors, np.asarray(keys))
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        state = self._load()
+
+        if state is not None and "fingerprint" in state:
+            fitted = int(state["fitted_count"])
+            known = len(state["coords"])
+            if known <= len(vectors) and str(state["fingerprint"]) == self.fingerprint(vectors[:known]):
+                new_rows = len(vectors) - known
+                if new_rows == 0:
+                    return state["coords"]
+                if known + new_rows - fitted <= self.refit_fraction * fitted:
+                    logging.info(f"Placing {new_rows} new vectors into the cached layout")
+                    return self._place(state, vectors, known)
+            logging.info("Cached layout is stale, refitting projection")
+
+        mean, components, reduced, coords = self._layout(vectors)
+        self._save({
+            "mean": mean,
+            "components": components,
+            "reduced": reduced,
+            "coords": coords,
+            "fitted_count": np.int64(len(vectors)),
+            "fingerprint": np.array(self.fingerprint(vectors)),
+        })
+        return coords
+
+    def _project_keyed(self, vectors, keys):
+        state = self._load()
+        if state is not None and "keys" in state:
+            row_of = {key: row for row, key in enumerate(state["keys"].tolist())}
+            rows = np.array([row_of.get(key, -1) for key in keys.tolist()], dtype=np.int64)
+            known = np.flatnonzero(rows >= 0)
+            fitted = np.zeros(len(keys), dtype=bool)
+            fitted[known] = state["fitted"][rows[known]]
+            fitted_count = int(fitted.sum())
+            if fitted_count and len(keys) - fitted_count <= self.refit_fraction * fitted_count:
+                coords = np.empty((len(keys), 2), dtype=np.float32)
+                coords[known] = state["coords"][rows[known]]
+                new = np.flatnonzero(rows < 0)
+                if len(new):
+                    logging.info(f"Placing {len(new)} new vectors into the cached layout")
+                    coords[new] = self._place_by_similarity(vectors, known, new, coords[known])
+                self._save({"keys": keys, "coords": coords, "fitted": fitted})
+                return coords
+            logging.info("Cached layout is stale, refitting projection")
+
+        if hasattr(vectors, "tocsr"):
+            from sklearn.decomposition import TruncatedSVD
+            n_components = max(1, min(self.sparse_components, vectors.shape[1] - 1, vectors.shape[0] - 1))
+            vectors = TruncatedSVD(n_components=n_components, random_state=self.random_state).fit_transform(vectors)
+        coords = self._layout(np.asarray(vectors, dtype=np.float32))[3]
+        self._save({"keys": keys, "coords": coords, "fitted": np.ones(len(keys), dtype=bool)})
+        return coords
+
+    def _reduce(self, vectors, mean, components):
+        return (vectors - mean) @ components.T
+
+    def _layout(self, vectors):
+        """PCA basis, reduced vectors and t-SNE coordinates of a full fit."""
+        from sklearn.decomposition import IncrementalPCA
+        from sklearn.manifold import TSNE
+
+        n_samples, n_features = vectors.shape
+        n_components = min(self.n_components, n_samples, n_features)
+        if n_samples >= 2 and n_components >= 2:
+            # Every partial_fit batch needs at least n_components rows
+            batch_size = max(self.batch_size, n_components)
+            pca = IncrementalPCA(n_components=n_components, batch_size=batch_size)
+            for start in range(0, n_samples, batch_size):
+                batch = vectors[start:start + batch_size]
+                if len(batch) < n_components:
+                    break
+                pca.partial_fit(batch)
+            mean = pca.mean_.astype(np.float32)
+            components = pca.components_.astype(np.float32)
+        else:
+            mean = vectors.mean(axis=0) if n_samples else np.zeros(n_features, dtype=np.float32)
+            components = np.eye(max(n_components, 1), n_features, dtype=np.float32)
+        reduced = self._reduce(vectors, mean, components).astype(np.float32)
+
+        if n_samples > 3:
+            tsne = TSNE(
+                n_components=2,
+                method='barnes_hut',
+                init='pca',
+                perplexity=min(self.perplexity, (n_samples - 1) / 3),
+                random_state=self.random_state,
+            )
+            coords = tsne.fit_transform(reduced).astype(np.float32)
+        else:
+            coords = np.zeros((n_samples, 2), dtype=np.float32)
+            coords[:, :min(2, reduced.shape[1])] = reduced[:, :2]
+
+        return mean, components, reduced, coords
+
+    def _place_by_similarity(self, vectors, known, new, known_coords):
+        """Coordinates of rows `new` as the similarity-weighted mean of their nearest `known` rows."""
+        from sklearn.preprocessing import normalize
+
+        matrix = normalize(vectors if hasattr(vectors, "tocsr") else np.asarray(vectors, dtype=np.float32))
+        known_matrix = matrix[known]
+        k = min(self.neighbours, len(known))
+        placed = np.empty((len(new), 2), dtype=np.float32)
+        for start in range(0, len(new), self.batch_size):
+            batch = new[start:start + self.batch_size]
+            similarity = matrix[batch] @ known_matrix.T
+            similarity = similarity.toarray() if hasattr(similarity, "toarray") else np.asarray(similarity)
+            nearest = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+            distances = 1.0 - np.take_along_axis(similarity, nearest, axis=1)
+            weights = 1.0 / (np.maximum(distances, 0) + 1e-6)
+            weights /= weights.sum(axis=1, keepdims=True)
+            placed[start:start + len(batch)] = (known_coords[nearest] * weights[:, :, None]).sum(axis=1)
+        return placed
+
+    def _place(self, state, vectors, known):
+        reduced = state["reduced"]
+        coords = state["coords"]
+        new_reduced = self._reduce(vectors[known:], state["mean"], state["components"]).astype(np.float32)
+
+        # Squared distances to the fitted layout via |a|^2 - 2ab + |b|^2
+        distances = (
+            (new_reduced ** 2).sum(axis=1)[:, None]
+            - 2 * new_reduced @ reduced.T
+            + (reduced ** 2).sum(axis=1)[None, :]
+        )
+        k = min(self.neighbours, len(reduced))
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        nearest_distances = np.sqrt(np.maximum(np.take_along_axis(distances, nearest, axis=1), 0))
+        weights = 1.0 / (nearest_distances + 1e-6)
+        weights /= weights.sum(axis=1, keepdims=True)
+        new_coords = (coords[nearest] * weights[:, :, None]).sum(axis=1).astype(np.float32)
+
+        state["reduced"] = np.vstack([reduced, new_reduced])
+        state["coords"] = np.vstack([coords, new_coords])
+        state["fingerprint"] = np.array(self.fingerprint(vectors))
+        self._save(state)
+        return state["coords"]
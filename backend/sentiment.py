@@ -1,22 +1,58 @@
-import nltk
-import argparse
-from nltk.sentiment import SentimentIntensityAnalyzer
-nltk.download('vader_lexicon')
-
 import os
+import json
+import hashlib
 import logging
+import time
+import argparse
+import threading
+import multiprocessing
+import numpy as np
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 
 # Dynamically construct the local repository path
 local_repo_path = os.path.join(os.path.expanduser('~'), 'projects/GitHub/daily_quote')
 
-# Setup logging
-logging.basicConfig(filename=os.path.join(local_repo_path, 'daily_quote_sentiment.log'), level=logging.INFO, format='%(asctime)s %(levelname)s:%(message)s')
+QUOTES_FILE = 'quotes.txt'
+# Byte offset and content hash of the part of each quotes file that has already been scored
+STATE_FILE = 'sentiment/.{name}_sentiment_state.json'
+
+# Column order of the binary score matrix written by write_columnar()
+SCORE_COLUMNS = ('neg', 'neu', 'pos', 'compound')
+
+# Smallest batch handed to a worker process; below this the IPC overhead dominates
+MIN_CHUNK_SIZE = 250
 
-# Set up argument parsing
-parser = argparse.ArgumentParser(description='Perform sentiment analysis on quotes.')
-parser.add_argument('--split', type=bool, nargs='?', const=True, default=False, help='Split output into separate files based on sentiment')
-args = parser.parse_args()
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+def _load_analyzer():
+    """
+    Build NLTK's VADER analyzer without touching the network when possible.
+
+    `vader_lexicon` is only downloaded if nltk.data cannot find it yet.
+    """
+    import nltk
+    from nltk.sentiment import SentimentIntensityAnalyzer
+    try:
+        nltk.data.find('sentiment/vader_lexicon.zip')
+    except LookupError:
+        nltk.download('vader_lexicon', quiet=True)
+    return SentimentIntensityAnalyzer()
+
+def get_analyzer():
+    """
+    Return the process-wide sentiment intensity analyzer, loading the lexicon on first use.
+
+    Returns:
+    SentimentIntensityAnalyzer: The shared VADER analyzer.
+    """
+    global _analyzer
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                _analyzer = _load_analyzer()
+    return _analyzer
 
 # Function to perform sentiment analysis
 def analyze_sentiment(text):
@@ -34,49 +70,391 @@ def analyze_sentiment(text):
         - 'pos': The positive sentiment score (between 0 and 1).
         - 'compound': The compound sentiment score (between -1 and 1).
     """
-    # Initialize the sentiment intensity analyzer
-    sia = SentimentIntensityAnalyzer()
-    sentiment = sia.polarity_scores(text)
-    return sentiment
-
-# Read text from a file
-with open('quotes.txt', 'r') as file:
-    quotes = file.read()
-
-# Split the text into quotes and authors
-quote_author_pairs = [quote.rsplit(" — ", 1) for quote in quotes.split("\n") if " — " in quote]
-quotes = [pair[0].strip() for pair in quote_author_pairs]
-
-# Initialize files for writing based on the split argument
-if args.split:
-    positive_file = open('sentiment/quotes_sentiment_positive.txt', 'w')
-    negative_file = open('sentiment/quotes_sentiment_negative.txt', 'w')
-    neutral_file = open('sentiment/quotes_sentiment_neutral.txt', 'w')
-else:
-    output_file = open('sentiment/quotes_sentiment.txt', 'w')
-    
-# Perform sentiment analysis on each quote and write to files
-for quote, author in quote_author_pairs:
-    sentiment = analyze_sentiment(quote)
-    output_string = f"Quote: {quote}\nAuthor: {author}\nSentiment: {sentiment}\n\n"
-    
-    # Determine the highest sentiment score
-    max_sentiment = max(sentiment, key=sentiment.get)
-    
-    if args.split:
-        if max_sentiment == 'pos':
-            positive_file.write(output_string)
-        elif max_sentiment == 'neg':
-            negative_file.write(output_string)
-        else:  # max_sentiment == 'neu'
-            neutral_file.write(output_string)
+    return get_analyzer().polarity_scores(text)
+
+def score_many(texts):
+    """
+    Analyzes the sentiment of several texts with the shared analyzer.
+
+    Parameters:
+    texts (iterable): The texts to analyze.
+
+    Returns:
+    list: One score dictionary per text, in input order (see analyze_sentiment).
+    """
+    polarity_scores = get_analyzer().polarity_scores
+    return [polarity_scores(text) for text in texts]
+
+def pool_size(count, workers=None):
+    """
+    Return how many worker processes score_parallel uses for `count` texts.
+
+    Parameters:
+    count (int): Number of texts to score.
+    workers (int): Requested worker processes. Defaults to the number of CPUs, and is never more than that.
+
+    Returns:
+    int: The worker processes that will run, 1 meaning the texts are scored in the current process.
+    """
+    cpus = os.cpu_count() or 1
+    workers = min(workers or cpus, cpus)
+    if workers <= 1 or count < 2 * MIN_CHUNK_SIZE:
+        return 1
+    return min(workers, count // MIN_CHUNK_SIZE)
+
+def score_parallel(texts, workers=None, chunk_size=None):
+    """
+    Analyzes the sentiment of many texts across a pool of worker processes.
+
+    The texts are split into contiguous chunks, each worker scores its chunks with its
+    own analyzer, and the results are merged back in input order. Small inputs and
+    `workers=1` are scored in the current process (see pool_size). Workers are spawned
+    rather than forked, so callers running threads of their own (e.g. the admin API's
+    job heartbeat) are not copied into them.
+
+    Parameters:
+    texts (list): The texts to analyze.
+    workers (int): Number of worker processes. Defaults to the number of CPUs.
+    chunk_size (int): Texts per chunk. Defaults to an even split across workers.
+
+    Returns:
+    list: One score dictionary per text, in input order (see analyze_sentiment).
+    """
+    texts = list(texts)
+    workers = pool_size(len(texts), workers)
+    if workers == 1:
+        return score_many(texts)
+
+    if chunk_size is None:
+        # A few chunks per worker keeps the pool balanced when some quotes are longer
+        chunk_size = max(MIN_CHUNK_SIZE, -(-len(texts) // (workers * 4)))
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=context) as executor:
+        results = []
+        for chunk_scores in executor.map(score_many, chunks):
+            results.extend(chunk_scores)
+    return results
+
+def output_name(path):
+    """
+    Return the base name used for a quotes file's sentiment outputs, e.g. 'quotes_es'.
+
+    Parameters:
+    path (str): The quotes file.
+    """
+    return os.path.splitext(os.path.basename(path))[0]
+
+def parse_quote_author_pairs(text):
+    """
+    Split quote file content into (quote, author) pairs.
+
+    Parameters:
+    text (str): The quote file content, one "<quote> — <author>" per line.
+
+    Returns:
+    list: The (quote, author) pairs; lines without a separator are skipped.
+    """
+    return [line.rsplit(" — ", 1) for line in text.split("\n") if " — " in line]
+
+def load_state(path):
+    """
+    Load the incremental scoring state written by the previous run.
+
+    Parameters:
+    path (str): The quotes file.
+
+    Returns:
+    dict: The saved state with 'offset', 'sha256', 'split', 'format' and 'sizes' keys, or None if there is none.
+    """
+    try:
+        with open(STATE_FILE.format(name=output_name(path)), 'r') as state_file:
+            return json.load(state_file)
+    except (OSError, ValueError):
+        return None
+
+def save_state(path, offset, digest, split, output_format='text'):
+    """
+    Record how much of the quotes file has been scored, and the size of each output file
+    at that point, replacing the state file atomically.
+
+    Parameters:
+    path (str): The quotes file.
+    offset (int): Byte offset just past the last scored line.
+    digest (str): SHA-256 hex digest of the bytes before `offset`.
+    split (bool): Whether the outputs were split by sentiment.
+    output_format (str): The output format that was written ('text', 'columnar' or 'both').
+    """
+    sizes = {
+        output: os.path.getsize(output)
+        for output in output_paths(path, split, output_format) if os.path.exists(output)
+    }
+    state_path = STATE_FILE.format(name=output_name(path))
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, 'w') as state_file:
+        json.dump({"offset": offset, "sha256": digest, "split": split, "format": output_format, "sizes": sizes},
+                  state_file)
+    os.replace(tmp_path, state_path)
+
+def output_paths(path, split, output_format='text'):
+    """
+    Return every output file a run with these settings writes for a quotes file.
+
+    Parameters:
+    path (str): The quotes file.
+    split (bool): Whether the text output is split by sentiment.
+    output_format (str): The output format ('text', 'columnar' or 'both').
+
+    Returns:
+    list: The output file paths.
+    """
+    name = output_name(path)
+    paths = []
+    if output_format in ('text', 'both'):
+        if split:
+            paths += [f'sentiment/{name}_sentiment_{label}.txt' for label in ('positive', 'negative', 'neutral')]
+        else:
+            paths.append(f'sentiment/{name}_sentiment.txt')
+    if output_format in ('columnar', 'both'):
+        paths += list(columnar_paths(path).values())
+    return paths
+
+def trim_outputs(path):
+    """
+    Truncate the outputs of a quotes file back to the sizes recorded with the saved state.
+
+    A run killed after appending to the outputs but before saving its state would
+    otherwise append the same quotes again on the next incremental run.
+
+    Parameters:
+    path (str): The quotes file.
+    """
+    state = load_state(path) or {}
+    for output, size in state.get('sizes', {}).items():
+        if os.path.exists(output) and os.path.getsize(output) > size:
+            logging.info("Dropping %d bytes of %s left by an interrupted run", os.path.getsize(output) - size, output)
+            with open(output, 'r+b') as output_file:
+                output_file.truncate(size)
+
+def read_unscored(path, incremental, split, output_format='text'):
+    """
+    Read the part of the quotes file that still needs scoring.
+
+    In incremental mode only the tail after the recorded offset is returned, as long
+    as the already-scored prefix is unchanged. A rewritten or truncated file, or a
+    change of output layout, falls back to a full re-score.
+
+    Parameters:
+    path (str): The quotes file.
+    incremental (bool): Whether to resume from the saved state.
+    split (bool): Whether the outputs are split by sentiment.
+    output_format (str): The output format being written ('text', 'columnar' or 'both').
+
+    Returns:
+    tuple: (text to score, new offset, digest of the scored prefix, whether to append to the outputs).
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    start = 0
+    state = load_state(path) if incremental else None
+    same_layout = state and state.get('split') == split and state.get('format', 'text') == output_format
+    if same_layout and state.get('offset', 0) <= len(data):
+        prefix = data[:state['offset']]
+        if hashlib.sha256(prefix).hexdigest() == state.get('sha256'):
+            start = state['offset']
+        else:
+            logging.info("Scored prefix of %s changed, re-scoring everything", path)
+
+    if start == 0:
+        end = len(data)
+    else:
+        # Only consume complete lines so a partially written last line is picked up next time
+        end = data.rfind(b'\n', start) + 1 or start
+
+    digest = hashlib.sha256(data[:end]).hexdigest()
+    return data[start:end].decode('utf-8', errors='replace'), end, digest, start > 0
+
+def write_results(path, quote_author_pairs, sentiments, split, append):
+    """
+    Write scored quote/author pairs to the sentiment output files of a quotes file.
+
+    Parameters:
+    path (str): The quotes file the pairs were read from.
+    quote_author_pairs (list): (quote, author) pairs.
+    sentiments (list): The score dictionaries for each pair.
+    split (bool): Whether to split the output into separate files based on sentiment.
+    append (bool): Whether to append to existing outputs instead of overwriting them.
+    """
+    # Initialize files for writing based on the split argument
+    name = output_name(path)
+    mode = 'a' if append else 'w'
+    if split:
+        files = {
+            'pos': open(f'sentiment/{name}_sentiment_positive.txt', mode),
+            'neg': open(f'sentiment/{name}_sentiment_negative.txt', mode),
+            'neu': open(f'sentiment/{name}_sentiment_neutral.txt', mode),
+        }
+    else:
+        output_file = open(f'sentiment/{name}_sentiment.txt', mode)
+
+    try:
+        for (quote, author), sentiment in zip(quote_author_pairs, sentiments):
+            output_string = f"Quote: {quote}\nAuthor: {author}\nSentiment: {sentiment}\n\n"
+
+            if split:
+                # Determine the highest sentiment score
+                max_sentiment = max(sentiment, key=sentiment.get)
+                files.get(max_sentiment, files['neu']).write(output_string)
+            else:
+                output_file.write(output_string)
+    finally:
+        # Close the files
+        if split:
+            for file in files.values():
+                file.close()
+        else:
+            output_file.close()
+
+def columnar_paths(path):
+    """
+    Return the file paths of the columnar sentiment output for a quotes file.
+
+    Parameters:
+    path (str): The quotes file.
+
+    Returns:
+    dict: Paths of the 'scores' (float32, one row per quote with SCORE_COLUMNS),
+        'offsets' (int64 end offset of each quote in 'text') and 'text' (UTF-8 quote lines) files.
+    """
+    name = output_name(path)
+    return {
+        "scores": f'sentiment/{name}_scores.f32',
+        "offsets": f'sentiment/{name}_offsets.i64',
+        "text": f'sentiment/{name}_text.txt',
+    }
+
+def write_columnar(path, quote_author_pairs, sentiments, append):
+    """
+    Write scores as raw little-endian float32 rows plus an offsets index into the quote text.
+
+    The files have no header, so appending is a plain byte append and readers can
+    memory-map them directly (see load_columnar).
+
+    Parameters:
+    path (str): The quotes file the pairs were read from.
+    quote_author_pairs (list): (quote, author) pairs.
+    sentiments (list): The score dictionaries for each pair.
+    append (bool): Whether to append to existing outputs instead of overwriting them.
+    """
+    paths = columnar_paths(path)
+    mode = 'ab' if append else 'wb'
+
+    scores = np.array(
+        [[sentiment[column] for column in SCORE_COLUMNS] for sentiment in sentiments],
+        dtype='<f4'
+    ).reshape(-1, len(SCORE_COLUMNS))
+    lines = [f"{quote} — {author}\n".encode('utf-8') for quote, author in quote_author_pairs]
+
+    base = os.path.getsize(paths["text"]) if append and os.path.exists(paths["text"]) else 0
+    offsets = base + np.cumsum([len(line) for line in lines], dtype='<i8')
+
+    with open(paths["scores"], mode) as scores_file:
+        scores_file.write(scores.tobytes())
+    with open(paths["offsets"], mode) as offsets_file:
+        offsets_file.write(offsets.astype('<i8').tobytes())
+    with open(paths["text"], mode) as text_file:
+        text_file.writelines(lines)
+
+def load_columnar(path):
+    """
+    Memory-map the columnar sentiment output of a quotes file without parsing it.
+
+    Parameters:
+    path (str): The quotes file whose output to load, e.g. 'quotes.txt'.
+
+    Returns:
+    dict: Zero-copy views keyed by SCORE_COLUMNS (float32), plus 'scores' (the N x 4 matrix),
+        'offsets' (int64 end offsets) and 'text' (uint8 buffer). Quote i is
+        text[offsets[i - 1] if i else 0:offsets[i]].
+    """
+    paths = columnar_paths(path)
+    if os.path.getsize(paths["scores"]) == 0:
+        scores = np.zeros((0, len(SCORE_COLUMNS)), dtype='<f4')
+        offsets = np.zeros(0, dtype='<i8')
     else:
-        output_file.write(output_string)
-
-# Close the files
-if args.split:
-    positive_file.close()
-    negative_file.close()
-    neutral_file.close()
-else:
-    output_file.close()
+        scores = np.memmap(paths["scores"], dtype='<f4', mode='r').reshape(-1, len(SCORE_COLUMNS))
+        offsets = np.memmap(paths["offsets"], dtype='<i8', mode='r')
+    text = np.memmap(paths["text"], dtype=np.uint8, mode='r') if os.path.getsize(paths["text"]) else np.zeros(0, dtype=np.uint8)
+
+    result = {column: scores[:, i] for i, column in enumerate(SCORE_COLUMNS)}
+    result.update({"scores": scores, "offsets": offsets, "text": text})
+    return result
+
+def write_outputs(path, quote_author_pairs, sentiments, offset, digest, split, output_format, append):
+    """
+    Write a quotes file's scores in the requested formats, then record the scoring state.
+
+    Appends start from the output sizes of the last saved state, so nothing is
+    duplicated when the previous run died between writing and saving.
+
+    Parameters:
+    path (str): The quotes file the pairs were read from.
+    quote_author_pairs (list): (quote, author) pairs.
+    sentiments (list): The score dictionaries for each pair.
+    offset (int): Byte offset just past the last scored line.
+    digest (str): SHA-256 hex digest of the bytes before `offset`.
+    split (bool): Whether to split the text output by sentiment.
+    output_format (str): 'text', 'columnar' or 'both'.
+    append (bool): Whether to append to existing outputs instead of overwriting them.
+    """
+    if append:
+        trim_outputs(path)
+    if output_format in ('text', 'both'):
+        write_results(path, quote_author_pairs, sentiments, split, append)
+    if output_format in ('columnar', 'both'):
+        write_columnar(path, quote_author_pairs, sentiments, append)
+
+    # Remember what has been scored for the next incremental run
+    save_state(path, offset, digest, split, output_format)
+
+def main():
+    # Setup logging
+    logging.basicConfig(filename=os.path.join(local_repo_path, 'daily_quote_sentiment.log'), level=logging.INFO, format='%(asctime)s %(levelname)s:%(message)s')
+
+    # Set up argument parsing
+    parser = argparse.ArgumentParser(description='Perform sentiment analysis on quotes.')
+    parser.add_argument('files', nargs='*', default=[QUOTES_FILE], help='Quote files to score, e.g. quotes.txt quotes_es.txt quotes_pt.txt quotes_it.txt')
+    parser.add_argument('--split', type=bool, nargs='?', const=True, default=False, help='Split output into separate files based on sentiment')
+    parser.add_argument('--incremental', action='store_true', help='Only score quotes appended since the last run and append them to the outputs')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes used for scoring (0 = one per CPU)')
+    parser.add_argument('--format', choices=['text', 'columnar', 'both'], default='text', help='Write free-text reports, memory-mappable binary score columns, or both')
+    args = parser.parse_args()
+
+    # Read every file first so the whole corpus is scored in one pool
+    batches = []
+    for path in args.files:
+        text, offset, digest, append = read_unscored(path, args.incremental, args.split, args.format)
+        logging.info("Scoring %d new bytes of %s (append=%s)", len(text.encode('utf-8')), path, append)
+        batches.append((path, parse_quote_author_pairs(text), offset, digest, append))
+
+    texts = [quote for _, pairs, _, _, _ in batches for quote, _ in pairs]
+    workers = pool_size(len(texts), args.workers or None)
+    start = time.perf_counter()
+    sentiments = score_parallel(texts, workers=workers)
+    elapsed = time.perf_counter() - start
+    rate = len(texts) / elapsed if elapsed > 0 else 0.0
+    message = f"Scored {len(texts)} quotes in {elapsed:.2f}s ({rate:.0f} quotes/s, workers={workers})"
+    logging.info(message)
+    print(message)
+
+    # Merge results back per file, in input order
+    position = 0
+    for path, pairs, offset, digest, append in batches:
+        batch_sentiments = sentiments[position:position + len(pairs)]
+        position += len(pairs)
+        write_outputs(path, pairs, batch_sentiments, offset, digest, args.split, args.format, append)
+
+if __name__ == "__main__":
+    main()
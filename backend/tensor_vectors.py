@@ -123,27 +123,21 @@
 # # Replace 'quotes.txt' with the path to your actual quotes file
 # process_quotes('quotes.txt')
 
-import spacy
 import numpy as np
 import os
 import logging
-from sklearn.decomposition import PCA
-from sklearn.manifold import TSNE
+import argparse
 import matplotlib.pyplot as plt
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
 from datetime import datetime
-
-# Load spaCy model
-nlp = spacy.load("en_core_web_md")
-# Initialize sentiment analyzer
-sia = SentimentIntensityAnalyzer()
+from sentiment import get_analyzer
+from vector_store import VectorStore
+from embedding_cache import EmbeddingCache, EMBEDDING_CACHE_DIR
+from projection import ProjectionCache
+from embedding_engines import SPACY_MODEL, SpacyEngine, get_nlp, embed_cached
 
 # Dynamically construct the local repository path
 local_repo_path = os.path.join(os.path.expanduser('~'), 'projects/GitHub/daily_quote')
 
-# Setup logging
-logging.basicConfig(filename=os.path.join(local_repo_path, 'daily_quote_vectors.log'), level=logging.INFO, format='%(asctime)s %(levelname)s:%(message)s')
-
 def generate_vector(quote):
     """
     Generate a vector representation for a given quote using spaCy.
@@ -155,10 +149,35 @@ def generate_vector(quote):
     numpy.ndarray: The vector representation of the quote.
     """
     # Use spaCy to tokenize and generate the vector
-    doc = nlp(quote)
+    doc = get_nlp()(quote)
     vector = doc.vector
     return vector
 
+def get_embedding_cache():
+    """
+    Return the on-disk embedding cache for the spaCy model.
+
+    Returns:
+    EmbeddingCache: Cache keyed by the model name and normalized quote text.
+    """
+    return EmbeddingCache(SPACY_MODEL, get_nlp().vocab.vectors_length, directory=EMBEDDING_CACHE_DIR)
+
+def embed_texts(texts, batch_size=256, n_process=1, cache=None):
+    """
+    Generate vector representations for many quotes with spaCy's batched nlp.pipe.
+
+    Parameters:
+    texts (list): The quotes to embed.
+    batch_size (int): Number of texts spaCy processes per batch.
+    n_process (int): Number of processes spaCy uses (-1 for one per CPU).
+    cache (EmbeddingCache): Optional cache; only quotes missing from it are run through spaCy.
+
+    Returns:
+    numpy.ndarray: A contiguous float32 matrix with one row per quote.
+    """
+    engine = SpacyEngine(batch_size=batch_size, n_process=n_process)
+    return embed_cached(engine, texts, cache if cache is not None else False)
+
 def analyze_sentiment(quote):
     """
     Analyze the sentiment of a given quote using VADER.
@@ -169,7 +188,7 @@ def analyze_sentiment(quote):
     Returns:
     str: The sentiment of the quote ('pos', 'neu', 'neg').
     """
-    sentiment = sia.polarity_scores(quote)
+    sentiment = get_analyzer().polarity_scores(quote)
     if sentiment['compound'] >= 0.05:
         return 'pos'
     elif sentiment['compound'] <= -0.05:
@@ -178,57 +197,54 @@ def analyze_sentiment(quote):
         return 'neu'
 
 # Function to process quotes and generate files
-def process_quotes(file_path):
+def process_quotes(file_path, batch_size=256, n_process=1, export_tsv=False, use_cache=True):
     with open(file_path, 'r') as quotes_file:
         quotes = quotes_file.readlines()
 
-    # Initialize lists to hold vectors, metadata, and sentiments
-    vectors = []
-    metadata = ["Quote\tAuthor"]
+    # Initialize lists to hold quote texts, metadata, and sentiments
+    texts = []
+    metadata = []
     sentiments = []
 
     for quote in quotes:
         # Split quote and author
         quote_text, author = quote.rsplit("—", 1)
-
-        # Generate a vector for each quote
-        vector = generate_vector(quote_text.strip())
-        vectors.append(vector)
+        texts.append(quote_text.strip())
 
         # Analyze sentiment
         sentiment = analyze_sentiment(quote_text.strip())
         sentiments.append(sentiment)
 
-        metadata.append(f"{quote_text.strip()}\t{author.strip()}")
+        metadata.append((quote_text.strip(), author.strip()))
 
-    # Write vectors to a TSV file
-    os.makedirs('vectors', exist_ok=True)
-    with open('vectors/vectors.tsv', 'w') as vectors_file:
-        vectors_file.write('\n'.join('\t'.join(map(str, vec)) for vec in vectors))
+    # Generate vectors for all quotes in batches
+    cache = get_embedding_cache() if use_cache else None
+    vectors = embed_texts(texts, batch_size=batch_size, n_process=n_process, cache=cache)
 
-    # Write metadata to a TSV file
-    with open('vectors/metadata.tsv', 'w') as metadata_file:
-        metadata_file.write('\n'.join(metadata))
-    
-    # Convert vectors to numpy array for visualization
-    vectors_np = np.array(vectors)
-    visualize_vectors(vectors_np, sentiments)
+    # Write vectors and metadata to the binary vector store
+    store = VectorStore('vectors')
+    store.write(vectors, metadata)
+
+    # Optionally export the TensorBoard projector TSV files
+    if export_tsv:
+        store.export_tsv('vectors/vectors.tsv', 'vectors/metadata.tsv')
+
+    visualize_vectors(vectors, sentiments)
 
 def visualize_vectors(vectors, sentiments):
     """
     Visualize high-dimensional vectors using PCA and t-SNE.
 
+    The layout is cached in vectors/quotes.projection.npz; quotes appended since the
+    last run are placed into the existing layout instead of re-running t-SNE.
+
     Parameters:
     vectors (numpy.ndarray): The high-dimensional vectors.
     sentiments (list): The sentiment labels corresponding to each vector.
     """
-    # Reduce dimensions using PCA
-    pca = PCA(n_components=50)
-    pca_result = pca.fit_transform(vectors)
-
-    # Further reduce dimensions using t-SNE
-    tsne = TSNE(n_components=2, verbose=1, perplexity=40, n_iter=300)
-    tsne_result = tsne.fit_transform(pca_result)
+    # Reduce dimensions using incremental PCA and Barnes-Hut t-SNE, reusing the cached layout
+    projection = ProjectionCache('vectors/quotes.projection.npz', n_components=50, perplexity=40)
+    tsne_result = projection.project(vectors)
 
     # Plotting the t-SNE results
     plt.figure(figsize=(16, 10))
@@ -254,5 +270,20 @@ def visualize_vectors(vectors, sentiments):
     plt.savefig('images/tsne_visualization_sentiment.png')
     plt.close()
 
-# Replace 'quotes.txt' with the path to your actual quotes file
-process_quotes('quotes.txt')
+def main():
+    # Setup logging
+    logging.basicConfig(filename=os.path.join(local_repo_path, 'daily_quote_vectors.log'), level=logging.INFO, format='%(asctime)s %(levelname)s:%(message)s')
+
+    parser = argparse.ArgumentParser(description='Generate quote vectors and a t-SNE visualization.')
+    parser.add_argument('file', nargs='?', default='quotes.txt', help='Quotes file to vectorize')
+    parser.add_argument('--batch-size', type=int, default=256, help='Number of quotes spaCy embeds per batch')
+    parser.add_argument('--n-process', type=int, default=1, help='Number of spaCy processes (-1 for one per CPU)')
+    parser.add_argument('--export-tsv', action='store_true', help='Also write vectors.tsv/metadata.tsv for the TensorBoard projector')
+    parser.add_argument('--no-cache', action='store_true', help='Re-embed every quote instead of reusing cached embeddings')
+    args = parser.parse_args()
+
+    process_quotes(args.file, batch_size=args.batch_size, n_process=args.n_process,
+                   export_tsv=args.export_tsv, use_cache=not args.no_cache)
+
+if __name__ == "__main__":
+    main()
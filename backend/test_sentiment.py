@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Round-trip tests for incremental and columnar sentiment output.
+
+Scores come from a deterministic stand-in so the tests need no VADER lexicon;
+what is checked is which lines get scored and what ends up in the output files.
+"""
+
+import numpy as np
+import pytest
+
+import sentiment
+
+
+def fake_score(text):
+    """Deterministic scores derived from the text, in the shape analyze_sentiment returns"""
+    neg = (len(text) % 7) / 10
+    pos = (len(text) % 5) / 10
+    return {'neg': neg, 'neu': round(1 - neg - pos, 3), 'pos': pos, 'compound': pos - neg}
+
+
+def run_scoring(path, incremental=False, split=False, output_format='columnar'):
+    """One pass of main() over a single file; returns the (quote, author) pairs scored"""
+    text, offset, digest, append = sentiment.read_unscored(path, incremental, split, output_format)
+    pairs = sentiment.parse_quote_author_pairs(text)
+    sentiments = [fake_score(quote) for quote, _ in pairs]
+    sentiment.write_outputs(path, pairs, sentiments, offset, digest, split, output_format, append)
+    return pairs
+
+
+def columnar_lines(path):
+    """Quote lines of the columnar output, decoded through the offsets index"""
+    data = sentiment.load_columnar(path)
+    text = data['text'].tobytes()
+    starts = np.concatenate([[0], data['offsets'][:-1]])
+    return [text[start:end].decode('utf-8') for start, end in zip(starts, data['offsets'])]
+
+
+@pytest.fixture
+def quotes_file(tmp_path, monkeypatch):
+    # Outputs and state are written relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'sentiment').mkdir()
+    path = tmp_path / 'quotes.txt'
+    path.write_text("Know thyself — Socrates\nCarpe diem — Horace\n", encoding='utf-8')
+    return path
+
+
+def test_columnar_round_trip(quotes_file):
+    run_scoring(str(quotes_file))
+
+    data = sentiment.load_columnar(str(quotes_file))
+    expected = [fake_score("Know thyself"), fake_score("Carpe diem")]
+    assert data['scores'].shape == (2, len(sentiment.SCORE_COLUMNS))
+    for i, column in enumerate(sentiment.SCORE_COLUMNS):
+        np.testing.assert_allclose(data[column], [scores[column] for scores in expected], rtol=1e-6)
+        np.testing.assert_array_equal(data[column], data['scores'][:, i])
+    assert columnar_lines(str(quotes_file)) == ["Know thyself — Socrates\n", "Carpe diem — Horace\n"]
+
+
+def test_incremental_run_scores_only_appended_lines(quotes_file):
+    path = str(quotes_file)
+    run_scoring(path)
+
+    # The partial last line is left for the next run
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write("Amor fati — Nietzsche\nPanta rhei — Hera")
+    assert run_scoring(path, incremental=True) == [["Amor fati", "Nietzsche"]]
+    assert run_scoring(path, incremental=True) == []
+
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write("clitus\n")
+    assert run_scoring(path, incremental=True) == [["Panta rhei", "Heraclitus"]]
+
+    assert columnar_lines(path) == [
+        "Know thyself — Socrates\n", "Carpe diem — Horace\n",
+        "Amor fati — Nietzsche\n", "Panta rhei — Heraclitus\n",
+    ]
+    np.testing.assert_allclose(
+        sentiment.load_columnar(path)['compound'],
+        [fake_score(quote)['compound'] for quote in ("Know thyself", "Carpe diem", "Amor fati", "Panta rhei")],
+        rtol=1e-6
+    )
+
+
+def test_incremental_text_output_matches_full_run(quotes_file, tmp_path):
+    path = str(quotes_file)
+    run_scoring(path, incremental=True, output_format='text')
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write("Amor fati — Nietzsche\n")
+    run_scoring(path, incremental=True, output_format='text')
+    incremental = (tmp_path / 'sentiment' / 'quotes_sentiment.txt').read_text(encoding='utf-8')
+
+    run_scoring(path, incremental=False, output_format='text')
+    full = (tmp_path / 'sentiment' / 'quotes_sentiment.txt').read_text(encoding='utf-8')
+
+    assert incremental == full
+    assert incremental.count("Quote: ") == 3
+
+
+def test_changed_prefix_forces_full_rescore(quotes_file):
+    path = str(quotes_file)
+    run_scoring(path)
+
+    quotes_file.write_text("Know thyself — Thales\nCarpe diem — Horace\n", encoding='utf-8')
+    assert len(run_scoring(path, incremental=True)) == 2
+    assert columnar_lines(path) == ["Know thyself — Thales\n", "Carpe diem — Horace\n"]
+
+
+def test_changed_output_format_forces_full_rescore(quotes_file):
+    path = str(quotes_file)
+    run_scoring(path, incremental=True, output_format='text')
+
+    assert len(run_scoring(path, incremental=True, output_format='columnar')) == 2
+    assert len(sentiment.load_columnar(path)['scores']) == 2
+
+
+@pytest.mark.parametrize("output_format", ['text', 'columnar', 'both'])
+def test_run_killed_before_saving_state_does_not_duplicate(quotes_file, tmp_path, monkeypatch, output_format):
+    path = str(quotes_file)
+    run_scoring(path, incremental=True, output_format=output_format)
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write("Amor fati — Nietzsche\n")
+
+    # The outputs are appended, then the process dies before the state is saved
+    def killed(*args, **kwargs):
+        raise KeyboardInterrupt
+    with monkeypatch.context() as patched:
+        patched.setattr(sentiment, 'save_state', killed)
+        with pytest.raises(KeyboardInterrupt):
+            run_scoring(path, incremental=True, output_format=output_format)
+
+    assert run_scoring(path, incremental=True, output_format=output_format) == [["Amor fati", "Nietzsche"]]
+    if output_format != 'columnar':
+        assert (tmp_path / 'sentiment' / 'quotes_sentiment.txt').read_text(encoding='utf-8').count("Quote: ") == 3
+    if output_format != 'text':
+        assert columnar_lines(path) == ["Know thyself — Socrates\n", "Carpe diem — Horace\n", "Amor fati — Nietzsche\n"]
+        assert len(sentiment.load_columnar(path)['scores']) == 3
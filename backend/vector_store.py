@@ -0,0 +1,155 @@
+import os
+import json
+import numpy as np
+
+
+class VectorStore:
+    """
+    Append-only on-disk store of quote embeddings.
+
+    Vectors are kept as a headerless little-endian float32 matrix (`<name>.f32`) that is
+    opened with np.memmap, so reading a store never parses or loads the whole file. Each
+    row has a matching line in a tab-separated sidecar (`<name>.meta.tsv`) with its id,
+    quote and author, and `<name>.json` records the vector dimension.
+    """
+
+    def __init__(self, directory='vectors', name='quotes'):
+        self.directory = directory
+        self.name = name
+        self.matrix_path = os.path.join(directory, f'{name}.f32')
+        self.metadata_path = os.path.join(directory, f'{name}.meta.tsv')
+        self.header_path = os.path.join(directory, f'{name}.json')
+
+    @property
+    def dim(self):
+        """The vector dimension, or None if the store has not been written yet."""
+        try:
+            with open(self.header_path, 'r') as header_file:
+                return json.load(header_file)['dim']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def __len__(self):
+        dim = self.dim
+        if not dim or not os.path.exists(self.matrix_path):
+            return 0
+        return os.path.getsize(self.matrix_path) // (4 * dim)
+
+    def write(self, vectors, metadata):
+        """
+        Replace the store contents.
+
+        Parameters:
+        vectors (numpy.ndarray): Matrix with one vector per row.
+        metadata (list): (quote, author) pairs, one per row.
+        """
+        for path in (self.matrix_path, self.metadata_path, self.header_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.append(vectors, metadata)
+
+    def append(self, vectors, metadata):
+        """
+        Append vectors and their metadata to the store.
+
+        Parameters:
+        vectors (numpy.ndarray): Matrix with one vector per row.
+        metadata (list): (quote, author) pairs, one per row.
+
+        Returns:
+        int: The id of the first appended row.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype='<f4')
+        if vectors.ndim != 2 or len(vectors) != len(metadata):
+            raise ValueError("Expected a 2-D matrix with one metadata row per vector")
+
+        os.makedirs(self.directory, exist_ok=True)
+        dim = self.dim
+        if dim is None:
+            dim = vectors.shape[1]
+            with open(self.header_path, 'w') as header_file:
+                json.dump({"dim": dim, "dtype": "<f4"}, header_file)
+        elif vectors.shape[1] != dim:
+            raise ValueError(f"Vector dimension {vectors.shape[1]} does not match store dimension {dim}")
+
+        start = self._truncate_partial_append()
+        # Metadata first: rows beyond the matrix length are ignored on read, so an
+        # interrupted append never exposes a vector without its metadata
+        with open(self.metadata_path, 'a', encoding='utf-8') as metadata_file:
+            for offset, (quote, author) in enumerate(metadata):
+                quote = quote.replace('\t', ' ').replace('\n', ' ')
+                author = author.replace('\t', ' ').replace('\n', ' ')
+                metadata_file.write(f"{start + offset}\t{quote}\t{author}\n")
+        with open(self.matrix_path, 'ab') as matrix_file:
+            matrix_file.write(vectors.tobytes())
+        return start
+
+    def _truncate_partial_append(self):
+        """
+        Drop what an interrupted append left behind: a partial trailing vector and
+        metadata lines beyond the last complete vector.
+
+        Returns:
+        int: The number of rows in the store.
+        """
+        count, dim = len(self), self.dim
+        if dim and os.path.exists(self.matrix_path) and os.path.getsize(self.matrix_path) != count * dim * 4:
+            with open(self.matrix_path, 'r+b') as matrix_file:
+                matrix_file.truncate(count * dim * 4)
+        if os.path.exists(self.metadata_path):
+            end = 0
+            with open(self.metadata_path, 'rb') as metadata_file:
+                for _ in range(count):
+                    line = metadata_file.readline()
+                    if not line.endswith(b'\n'):
+                        break
+                    end += len(line)
+            if os.path.getsize(self.metadata_path) != end:
+                with open(self.metadata_path, 'r+b') as metadata_file:
+                    metadata_file.truncate(end)
+        return count
+
+    def open(self):
+        """
+        Memory-map the stored vectors.
+
+        Returns:
+        numpy.ndarray: A read-only (count, dim) float32 view backed by the file.
+        """
+        count, dim = len(self), self.dim
+        if not count:
+            return np.zeros((0, dim or 0), dtype='<f4')
+        return np.memmap(self.matrix_path, dtype='<f4', mode='r', shape=(count, dim))
+
+    def metadata(self):
+        """
+        Read the metadata sidecar.
+
+        Returns:
+        list: (id, quote, author) tuples for every stored vector.
+        """
+        count = len(self)
+        rows = []
+        if not count:
+            return rows
+        with open(self.metadata_path, 'r', encoding='utf-8') as metadata_file:
+            for line in metadata_file:
+                row_id, quote, author = line.rstrip('\n').split('\t')
+                rows.append((int(row_id), quote, author))
+                if len(rows) == count:
+                    break
+        return rows
+
+    def export_tsv(self, vectors_path='vectors/vectors.tsv', metadata_path='vectors/metadata.tsv'):
+        """
+        Export the store in the TensorBoard projector TSV format.
+
+        Parameters:
+        vectors_path (str): Destination of the tab-separated vectors.
+        metadata_path (str): Destination of the Quote/Author metadata.
+        """
+        vectors = self.open()
+        with open(vectors_path, 'w') as vectors_file:
+            vectors_file.write('\n'.join('\t'.join(map(str, vec)) for vec in vectors))
+        with open(metadata_path, 'w') as metadata_file:
+            metadata_file.write('\n'.join(["Quote\tAuthor"] + [f"{quote}\t{author}" for _, quote, author in self.metadata()]))
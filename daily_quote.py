@@ -1,31 +1,66 @@
 #!/usr/bin/env python3
 import os
 import git
+import json
 import requests
 import logging
 import argparse
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import quote, unquote
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from translation_cache import get_translation_cache
 
 # Dynamically construct the local repository path
 #local_repo_path = os.path.join(os.path.expanduser('~'), 'projects/GitHub/daily_quote')
 local_repo_path = os.path.dirname(os.path.abspath(__file__))
 
+# Local spool of prefetched quotes, consumed by daily_commit() before hitting the API
+QUOTE_BUFFER_FILE = 'quotes_buffer.jsonl'
+
+# Translation endpoint; override with TRANSLATION_API_URL to point at a stand-in server
+TRANSLATION_API_URL = os.getenv('TRANSLATION_API_URL', 'https://api.mymemory.translated.net/get')
+TRANSLATION_TIMEOUT = 10
+
+# Target languages and the files their translations are appended to
+TRANSLATION_FILES = {
+    "es": "quotes_es.txt",
+    "pt": "quotes_pt.txt",
+    "it": "quotes_it.txt",
+}
+
 # Setup logging
 logging.basicConfig(filename=os.path.join(local_repo_path, 'daily_quote.log'), level=logging.INFO, format='%(asctime)s %(levelname)s:%(message)s')
 
-def generate_quote(category=None):
+def create_session(pool_maxsize=10):
     """
-    Generate a random quote from the specified category or from any category if not specified.
+    Create a pooled HTTP session with a retry strategy for the quote and translation APIs.
 
     Args:
-        category (str, optional): The category of the quote. Defaults to None.
+        pool_maxsize (int, optional): Maximum number of pooled connections per host. Defaults to 10.
 
     Returns:
-        str: A randomly generated quote in the format "<quote> — <author>".
-             Returns None if there was an error fetching the quote.
+        requests.Session: A session that reuses connections across requests.
+    """
+    session = requests.Session()
+    retry_strategy = Retry(
+        total=3,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+    )
+    adapter = HTTPAdapter(max_retries=retry_strategy, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def get_api_key():
+    """
+    Read and clean the API Ninjas key from the environment.
+
+    Returns:
+        str: The API key, or None if the environment variable is not set.
     """
-    # Get API key from environment variable
     api_key = os.getenv('API_NINJAS_KEY')
     if not api_key:
         logging.error("API_NINJAS_KEY environment variable not set")
@@ -41,7 +76,22 @@ def generate_quote(category=None):
     # Log masked version of API key for debugging
     masked_key = f"{api_key[:4]}{'*' * (len(api_key) - 4)}"
     logging.info(f"Using API key (masked): {masked_key}")
+    return api_key
 
+def fetch_quote_data(api_key, category=None, session=None):
+    """
+    Fetch a single raw quote record from the API Ninjas quotes endpoint.
+
+    Args:
+        api_key (str): The API Ninjas key.
+        category (str, optional): The category of the quote. Defaults to None.
+        session (requests.Session, optional): Session to reuse for the request. Defaults to None.
+
+    Returns:
+        dict: The quote record with at least 'quote' and 'author' keys.
+              Returns None if there was an error fetching the quote.
+    """
+    http = session or requests
     api_url = 'https://api.api-ninjas.com/v1/quotes'
     headers = {'X-Api-Key': api_key}
 
@@ -62,7 +112,7 @@ def generate_quote(category=None):
         logging.info("Headers being sent (key masked): X-Api-Key: " + "*" * len(api_key))
 
         # Make the request
-        response = requests.get(
+        response = http.get(
             api_url,
             headers=headers,
             params=params if params else None,
@@ -104,7 +154,7 @@ def generate_quote(category=None):
 
         logging.info("Successfully fetched quote")
         logging.info(f"Quote category: {quote_data.get('category', 'not specified')}")
-        return f"{quote_data['quote']} — {quote_data['author']}"
+        return quote_data
 
     except requests.exceptions.Timeout:
         logging.error("Request timed out after 10 seconds")
@@ -121,25 +171,229 @@ def generate_quote(category=None):
         logging.error(f"Unexpected error: {str(e)}")
         return None
 
-def translate_quote(quote, target_lang):
+def generate_quote(category=None, session=None):
+    """
+    Generate a random quote from the specified category or from any category if not specified.
+
+    Args:
+        category (str, optional): The category of the quote. Defaults to None.
+        session (requests.Session, optional): Session to reuse for the request. Defaults to None.
+
+    Returns:
+        str: A randomly generated quote in the format "<quote> — <author>".
+             Returns None if there was an error fetching the quote.
+    """
+    api_key = get_api_key()
+    if not api_key:
+        return None
+
+    quote_data = fetch_quote_data(api_key, category, session)
+    if quote_data is None:
+        return None
+    return f"{quote_data['quote']} — {quote_data['author']}"
+
+def _read_buffer():
+    """
+    Read all buffered quote records from the local JSONL spool.
+
+    Returns:
+        list: The buffered records, oldest first. Unreadable lines are skipped.
+    """
+    buffer_path = os.path.join(local_repo_path, QUOTE_BUFFER_FILE)
+    if not os.path.exists(buffer_path):
+        return []
+
+    records = []
+    with open(buffer_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logging.warning(f"Skipping malformed buffer entry: {line[:80]}")
+    return records
+
+def _write_buffer(records):
+    """
+    Atomically replace the local JSONL spool with the given records.
+
+    Args:
+        records (list): The quote records to keep in the buffer.
+    """
+    buffer_path = os.path.join(local_repo_path, QUOTE_BUFFER_FILE)
+    tmp_path = f"{buffer_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        for record in records:
+            file.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, buffer_path)
+
+def prefetch_quotes(count, category=None):
+    """
+    Fetch several quotes over one pooled session and append them to the local buffer.
+
+    Args:
+        count (int): The number of quotes to fetch.
+        category (str, optional): The category of the quotes. Defaults to None.
+
+    Returns:
+        int: The number of new quotes added to the buffer.
+    """
+    api_key = get_api_key()
+    if not api_key:
+        return 0
+
+    records = _read_buffer()
+    seen = {record['quote'] for record in records}
+    added = 0
+
+    with create_session() as session:
+        for _ in range(count):
+            quote_data = fetch_quote_data(api_key, category, session)
+            if quote_data is None:
+                # The API is failing; keep whatever was fetched so far
+                break
+            if quote_data['quote'] in seen:
+                logging.info("Skipping duplicate quote in prefetch batch")
+                continue
+            seen.add(quote_data['quote'])
+            records.append({
+                "quote": quote_data['quote'],
+                "author": quote_data['author'],
+                "category": category.lower() if category else quote_data.get('category'),
+                "fetched_at": datetime.now().isoformat(timespec='seconds'),
+            })
+            added += 1
+
+    if added:
+        _write_buffer(records)
+    logging.info(f"Prefetched {added} quotes, {len(records)} now buffered")
+    return added
+
+def pop_buffered_quote(category=None):
+    """
+    Take the oldest buffered quote, optionally restricted to a category.
+
+    Args:
+        category (str, optional): The category of the quote. Defaults to None.
+
+    Returns:
+        str: A quote in the format "<quote> — <author>", or None if no matching quote is buffered.
+    """
+    records = _read_buffer()
+    for index, record in enumerate(records):
+        if category and record.get('category') != category.lower():
+            continue
+        del records[index]
+        _write_buffer(records)
+        logging.info(f"Using buffered quote, {len(records)} remaining")
+        return f"{record['quote']} — {record['author']}"
+    return None
+
+def translate_quote(quote, target_lang, session=None, timeout=TRANSLATION_TIMEOUT):
     """
     Translate a quote to the specified language using the MyMemory API.
 
     Args:
         quote (str): The quote to translate.
         target_lang (str): The target language code (e.g., 'es' for Spanish, 'pt' for Portuguese).
+        session (requests.Session, optional): Session to reuse for the request. Defaults to None.
+        timeout (float, optional): Per-request timeout in seconds. Defaults to TRANSLATION_TIMEOUT.
 
     Returns:
-        str: The translated quote.
+        str: The translated quote, or None if the translation failed.
     """
-    url = "https://api.mymemory.translated.net/get"
+    http = session or requests
     params = {
         "q": quote,
         "langpair": f"en|{target_lang}"
     }
-    response = requests.get(url, params=params)
-    translated_text = response.json()['responseData']['translatedText']
-    return translated_text
+    try:
+        response = http.get(TRANSLATION_API_URL, params=params, timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
+        # MyMemory answers quota and other errors with HTTP 200 and the warning as the "translation"
+        if str(data.get('responseStatus')) != '200':
+            logging.error(f"Translation to '{target_lang}' failed with status {data.get('responseStatus')}: "
+                          f"{data.get('responseDetails') or data['responseData'].get('translatedText')}")
+            return None
+        return data['responseData']['translatedText']
+    except requests.exceptions.Timeout:
+        logging.error(f"Translation to '{target_lang}' timed out after {timeout} seconds")
+    except requests.exceptions.RequestException as e:
+        logging.error(f"Translation to '{target_lang}' failed: {e}")
+    except (ValueError, KeyError, TypeError) as e:
+        logging.error(f"Unexpected translation response for '{target_lang}': {e}")
+    return None
+
+def translate_quotes(quotes, target_langs=None, max_workers=8, session=None, cache=None):
+    """
+    Translate a list of quotes into several languages concurrently.
+
+    Translations already in the persistent cache are reused; every remaining
+    unique (quote, language) pair is submitted to a bounded thread pool sharing
+    one pooled session, so a daily run costs at most one translation round-trip.
+
+    Args:
+        quotes (list): The quotes to translate.
+        target_langs (list, optional): Target language codes. Defaults to all of TRANSLATION_FILES.
+        max_workers (int, optional): Maximum number of concurrent requests. Defaults to 8.
+        session (requests.Session, optional): Session to reuse for the requests. Defaults to None.
+        cache (TranslationCache, optional): Translation cache to use. Defaults to the shared on-disk cache.
+
+    Returns:
+        dict: Maps each language code to a list of translations in the same order
+              as `quotes`. Failed translations are None.
+    """
+    target_langs = list(target_langs or TRANSLATION_FILES)
+    results = {lang: [None] * len(quotes) for lang in target_langs}
+    if not quotes:
+        return results
+
+    if cache is None:
+        cache = get_translation_cache()
+
+    # Resolve cache hits and collapse duplicated quotes into one request each
+    pending = {}
+    for index, quote in enumerate(quotes):
+        for lang in target_langs:
+            if (quote, lang) in pending:
+                pending[(quote, lang)].append(index)
+                continue
+            cached = cache.get(quote, lang)
+            if cached is not None:
+                results[lang][index] = cached
+            else:
+                pending[(quote, lang)] = [index]
+
+    if not pending:
+        logging.info("All translations served from cache")
+        return results
+    logging.info(f"Translating {len(pending)} uncached quote/language pairs")
+
+    owns_session = session is None
+    if owns_session:
+        session = create_session(pool_maxsize=max_workers)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(translate_quote, quote, lang, session): (quote, lang)
+                for quote, lang in pending
+            }
+            for future in as_completed(futures):
+                quote, lang = futures[future]
+                translated = future.result()
+                if translated is not None:
+                    cache.set(quote, lang, translated)
+                for index in pending[(quote, lang)]:
+                    results[lang][index] = translated
+    finally:
+        if owns_session:
+            session.close()
+
+    return results
 
 def save_quotes(filename, quotes):
     """
@@ -157,13 +411,18 @@ def daily_commit(category=None):
     """
     Commits a new daily inspirational quote to a Git repository.
 
+    Quotes are taken from the local prefetch buffer first; the API is only
+    called when no matching quote is buffered.
+
     Args:
         category (str, optional): The category of the quote. Defaults to None.
 
     Returns:
         None
     """
-    quote = generate_quote(category)
+    quote = pop_buffered_quote(category)
+    if quote is None:
+        quote = generate_quote(category)
     if quote is None:
         logging.info("No new quote fetched, skipping commit.")
         return
@@ -171,13 +430,16 @@ def daily_commit(category=None):
     # Save the original English quote
     save_quotes("quotes.txt", [quote])
 
-    # Translate the quote to Spanish and Portuguese
-    quote_es = translate_quote(quote, "es")
-    quote_pt = translate_quote(quote, "pt")
+    # Translate the quote to every target language at once
+    translations = translate_quotes([quote])
 
     # Save the translated quotes
-    save_quotes("quotes_es.txt", [quote_es])
-    save_quotes("quotes_pt.txt", [quote_pt])
+    for lang, filename in TRANSLATION_FILES.items():
+        translated = translations[lang][0]
+        if translated is None:
+            logging.warning(f"Skipping {filename}: translation to '{lang}' failed")
+            continue
+        save_quotes(filename, [translated])
 
     try:
         repo = git.Repo(local_repo_path)
@@ -196,7 +458,13 @@ def daily_commit(category=None):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Fetch and commit a daily inspirational quote. Optionally specify a category.")
     parser.add_argument('--category', type=str, help='Specify the category of the quote')
+    parser.add_argument('--prefetch', type=int, metavar='N', help='Fetch N quotes into the local buffer and exit without committing')
     args = parser.parse_args()
+    if args.prefetch is not None and args.prefetch < 1:
+        parser.error('--prefetch must be at least 1')
 
-    # Execute the daily commit function with the category if provided
-    daily_commit(category=args.category)
+    if args.prefetch is not None:
+        prefetch_quotes(args.prefetch, category=args.category)
+    else:
+        # Execute the daily commit function with the category if provided
+        daily_commit(category=args.category)
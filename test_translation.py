@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the concurrent translation stage of daily_quote.py.
+
+A local http.server stands in for the MyMemory API.
+"""
+
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+import daily_quote
+from translation_cache import TranslationCache
+
+# Seconds the stub waits before answering, so serial and concurrent runs are easy to tell apart
+STUB_DELAY = 0.3
+
+
+class StubTranslationHandler(BaseHTTPRequestHandler):
+    """
+    Answers like MyMemory with '[<lang>] <text>'. Texts starting with 'FAIL' get an HTTP
+    error, texts starting with 'QUOTA' the HTTP 200 quota warning MyMemory sends.
+    """
+
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        text = params["q"][0]
+        target_lang = params["langpair"][0].split("|")[1]
+        self.server.requests.append((text, target_lang))
+        time.sleep(self.server.delay)
+
+        if text.startswith("FAIL"):
+            # Not a status create_session() retries, so the failure is immediate
+            self.send_response(400)
+            self.end_headers()
+            return
+        if text.startswith("QUOTA"):
+            payload = {
+                "responseData": {"translatedText": "MYMEMORY WARNING: YOU USED ALL AVAILABLE FREE TRANSLATIONS FOR TODAY."},
+                "responseStatus": 429,
+                "responseDetails": "MYMEMORY WARNING: YOU USED ALL AVAILABLE FREE TRANSLATIONS FOR TODAY.",
+            }
+        else:
+            payload = {"responseData": {"translatedText": f"[{target_lang}] {text}"}, "responseStatus": 200}
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubTranslationHandler)
+    server.requests = []
+    server.delay = STUB_DELAY
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(daily_quote, "TRANSLATION_API_URL", f"http://127.0.0.1:{server.server_address[1]}/get")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    translation_cache = TranslationCache(path=str(tmp_path / "translation_cache.sqlite3"))
+    yield translation_cache
+    translation_cache.close()
+
+
+def test_translate_quotes_fans_out_all_languages(stub_server, cache):
+    quotes = ["Know thyself — Socrates", "Carpe diem — Horace"]
+
+    start = time.perf_counter()
+    results = daily_quote.translate_quotes(quotes, cache=cache)
+    elapsed = time.perf_counter() - start
+
+    assert set(results) == set(daily_quote.TRANSLATION_FILES)
+    for lang, translations in results.items():
+        assert translations == [f"[{lang}] {quote}" for quote in quotes]
+    assert len(stub_server.requests) == len(quotes) * len(daily_quote.TRANSLATION_FILES)
+    # Six requests in flight at once take about one round-trip, not six
+    assert elapsed < 3 * STUB_DELAY
+
+
+def test_translate_quotes_requests_each_pair_once(stub_server, cache):
+    quotes = ["Carpe diem — Horace", "Carpe diem — Horace", "Know thyself — Socrates"]
+
+    first = daily_quote.translate_quotes(quotes, target_langs=["es"], cache=cache)
+    assert first["es"] == ["[es] Carpe diem — Horace"] * 2 + ["[es] Know thyself — Socrates"]
+    assert sorted(stub_server.requests) == [("Carpe diem — Horace", "es"), ("Know thyself — Socrates", "es")]
+
+    # A second run is served from the cache
+    second = daily_quote.translate_quotes(quotes, target_langs=["es"], cache=cache)
+    assert second == first
+    assert len(stub_server.requests) == 2
+
+
+def test_translate_quotes_reports_failures_without_caching_them(stub_server, cache):
+    results = daily_quote.translate_quotes(["FAIL — Nobody", "Carpe diem — Horace"], target_langs=["it"], cache=cache)
+
+    assert results["it"] == [None, "[it] Carpe diem — Horace"]
+    assert cache.get("FAIL — Nobody", "it") is None
+    assert cache.get("Carpe diem — Horace", "it") == "[it] Carpe diem — Horace"
+
+
+def test_translate_quotes_rejects_quota_warnings(stub_server, cache):
+    results = daily_quote.translate_quotes(["QUOTA — Nobody", "Carpe diem — Horace"], target_langs=["es"], cache=cache)
+
+    assert results["es"] == [None, "[es] Carpe diem — Horace"]
+    assert cache.get("QUOTA — Nobody", "es") is None
+
+
+def test_translate_quote_times_out(stub_server):
+    assert daily_quote.translate_quote("Carpe diem — Horace", "pt", timeout=STUB_DELAY / 3) is None
+
+
+def test_translate_quotes_empty_list(cache):
+    assert daily_quote.translate_quotes([], cache=cache) == {lang: [] for lang in daily_quote.TRANSLATION_FILES}
+
+
+def test_cache_drops_stored_quota_warnings(tmp_path):
+    path = str(tmp_path / "translation_cache.sqlite3")
+    cache = TranslationCache(path=path)
+    cache.set("Carpe diem — Horace", "es", "MYMEMORY WARNING: YOU USED ALL AVAILABLE FREE TRANSLATIONS FOR TODAY.")
+    cache.set("Know thyself — Socrates", "es", "Conócete a ti mismo — Sócrates")
+    cache.close()
+
+    reopened = TranslationCache(path=path)
+    assert reopened.get("Carpe diem — Horace", "es") is None
+    assert reopened.get("Know thyself — Socrates", "es") == "Conócete a ti mismo — Sócrates"
+    reopened.close()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Disk-backed translation cache shared by daily_quote.py and other translation callers.
+
+Translations are stored in a small SQLite file keyed by a hash of the source
+text and language pair, so repeated or duplicated quotes never hit the
+translation API twice. The cache is bounded and evicts least recently used
+entries once it grows past `max_entries`.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+DEFAULT_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'translation_cache.sqlite3')
+DEFAULT_MAX_ENTRIES = 50000
+
+# MyMemory returns its quota and error warnings in place of the translated text
+PROVIDER_WARNING_PREFIX = 'MYMEMORY WARNING'
+
+
+class TranslationCache:
+    """Bounded LRU cache of translations persisted in SQLite."""
+
+    def __init__(self, path=DEFAULT_CACHE_FILE, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " key TEXT PRIMARY KEY,"
+            " translated TEXT NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_translations_last_used ON translations (last_used)")
+        # Quota warnings that older versions stored as translations
+        self._conn.execute(
+            "DELETE FROM translations WHERE translated LIKE ?", (f"{PROVIDER_WARNING_PREFIX}%",)
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(text, source_lang, target_lang):
+        """Build the cache key for a text and language pair."""
+        payload = f"{source_lang}|{target_lang}|{text.strip()}"
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, text, target_lang, source_lang="en"):
+        """
+        Look up a cached translation and mark it as recently used.
+
+        Args:
+            text (str): The source text.
+            target_lang (str): The target language code.
+            source_lang (str, optional): The source language code. Defaults to "en".
+
+        Returns:
+            str: The cached translation, or None on a cache miss.
+        """
+        key = self.make_key(text, source_lang, target_lang)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT translated FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE translations SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+        return row[0]
+
+    def set(self, text, target_lang, translated, source_lang="en"):
+        """
+        Store a translation, evicting the least recently used entries if the cache is full.
+
+        Args:
+            text (str): The source text.
+            target_lang (str): The target language code.
+            translated (str): The translated text.
+            source_lang (str, optional): The source language code. Defaults to "en".
+        """
+        key = self.make_key(text, source_lang, target_lang)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations (key, translated, last_used) VALUES (?, ?, ?)",
+                (key, translated, time.time())
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop the least recently used entries beyond max_entries."""
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM translations WHERE key IN ("
+                " SELECT key FROM translations ORDER BY last_used ASC LIMIT ?)",
+                (overflow,)
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def close(self):
+        """Close the underlying SQLite connection."""
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache = None
+
+
+def get_translation_cache():
+    """
+    Return the process-wide translation cache, opening it on first use.
+
+    The location can be overridden with the TRANSLATION_CACHE_PATH environment variable.
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = TranslationCache(os.getenv('TRANSLATION_CACHE_PATH', DEFAULT_CACHE_FILE))
+    return _default_cache